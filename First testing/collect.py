@@ -1,13 +1,22 @@
 import serial
 import csv
+import os
+import sys
 import time
 import datetime  
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from acquisition import make_parser
+from ingest import read_block
+
 COM_PORT = 'COM6'  # Replace with your Arduino's COM port
 BAUD_RATE = 115200  # Must match the Arduino's BAUD_RATE
+SAMPLE_RATE = 512  # Must match the Arduino's SAMPLE_RATE
+SERIAL_FORMAT = "auto"  # "binary" frames, legacy "ascii" lines, or detect
 
 # Open the serial connection
 ser = serial.Serial(COM_PORT, BAUD_RATE)
+parser = make_parser(SERIAL_FORMAT)
 
 # Create a CSV file to save the data
 with open('signal.csv', 'a', newline='') as csvfile:
@@ -21,17 +30,17 @@ with open('signal.csv', 'a', newline='') as csvfile:
     print("Collecting data...")
 
     while time.time() - start_time < max_duration:
-        # Read a line of data from the Arduino (until a newline character)
-        data = ser.readline().decode("latin-1").strip()
-
-        # Get the current timestamp
-        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-        
-        # Split the data into a list of values using the comma as a delimiter
-        values = data.split(',')
-
-        if len(values) > 0  and values[0].isdigit():
+        # Block until ~20 ms of data is in, then decode it in one go
+        values = read_block(ser, parser, SAMPLE_RATE)
+        if len(values) == 0:
+            continue
+
+        # Timestamp each sample, spread back from the time of the read
+        now = datetime.datetime.now()
+        for i, value in enumerate(values.tolist()):
+            offset = datetime.timedelta(seconds=(len(values) - 1 - i) / SAMPLE_RATE)
+            current_time = (now - offset).strftime('%Y-%m-%d %H:%M:%S.%f')
             # Save the data to the CSV file along with the timestamp
-            csvwriter.writerow([current_time, values[0]])
+            csvwriter.writerow([current_time, value])
 
 ser.close()
@@ -28,8 +28,10 @@ def process_eeg_data(data, b_notch, a_notch, b_bandpass, a_bandpass):
     data = signal.filtfilt(b_bandpass, a_bandpass, data)
     return data
 
-def calculate_psd_features(segment, sampling_rate):
-    f, psd_values = signal.welch(segment, fs=sampling_rate, nperseg=len(segment))
+def calculate_psd(segment, sampling_rate):
+    return signal.welch(segment, fs=sampling_rate, nperseg=len(segment))
+
+def calculate_psd_features(f, psd_values):
     bands = {'alpha': (8, 13), 'beta': (14, 30), 'theta': (4, 7), 'delta': (0.5, 3)}
     features = {}
     for band, (low, high) in bands.items():
@@ -38,8 +40,7 @@ def calculate_psd_features(segment, sampling_rate):
     features['alpha_beta_ratio'] = features['E_alpha'] / features['E_beta'] if features['E_beta'] > 0 else 0
     return features
 
-def calculate_additional_features(segment, sampling_rate):
-    f, psd = signal.welch(segment, fs=sampling_rate, nperseg=len(segment))
+def calculate_additional_features(f, psd):
     peak_frequency = f[np.argmax(psd)]
     spectral_centroid = np.sum(f * psd) / np.sum(psd)
     log_f = np.log(f[1:])
@@ -70,8 +71,9 @@ def main():
                 if len(buffer) == 512:
                     buffer_array = np.array(buffer)
                     processed_data = process_eeg_data(buffer_array, b_notch, a_notch, b_bandpass, a_bandpass)
-                    psd_features = calculate_psd_features(processed_data, 512)
-                    additional_features = calculate_additional_features(processed_data, 512)
+                    f, psd = calculate_psd(processed_data, 512)  # one PSD for both feature sets
+                    psd_features = calculate_psd_features(f, psd)
+                    additional_features = calculate_additional_features(f, psd)
                     features = {**psd_features, **additional_features}
 
                     df = pd.DataFrame([features])
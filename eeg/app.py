@@ -4,348 +4,453 @@ EEG Calmness Monitor - Complete Web Application
 Combines calibration, training, and real-time prediction
 """
 
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+# Async server: with eventlet (pinned in requirements.txt) every dashboard
+# socket is a green thread, so hundreds of viewers stay cheap. It has to
+# patch the standard library before anything else imports it. Job worker
+# processes (see jobs.py) start without this script and serve no sockets;
+# should one import it anyway it is left unpatched (a worker has
+# multiprocessing loaded already, the server has not yet)
+import os
+import sys
+
+# `python app.py --profile-startup` re-runs the start-up under -X importtime
+# and reports it (see startup.py) instead of serving
+if __name__ == '__main__' and '--profile-startup' in sys.argv:
+    from startup import profile_startup
+    sys.exit(profile_startup(os.path.abspath(__file__)))
+
+ASYNC_MODE = 'threading'
+_mp = sys.modules.get('multiprocessing')
+if __name__ != '__mp_main__' and (_mp is None or _mp.parent_process() is None):
+    # The server binds an address and never resolves names, so skip
+    # eventlet's green DNS resolver (a large import of its own)
+    os.environ.setdefault('EVENTLET_NO_GREENDNS', 'yes')
+    try:
+        import eventlet
+        import eventlet.wsgi
+        eventlet.monkey_patch()
+        ASYNC_MODE = 'eventlet'
+    except ImportError:
+        pass
+
+from flask import Flask, Response, render_template, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import serial
 import serial.tools.list_ports
 import numpy as np
-import pandas as pd
 import time
-import os
-import joblib
+import socket
 import threading
-from collections import deque
-from scipy.signal import butter, filtfilt, iirnotch, welch
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, confusion_matrix
+from scheduler import HopScheduler
+from ringbuffer import RingBuffer
+from acquisition import make_parser
+from ingest import SerialIngest
+from pipeline import BoundedQueue, run_stage
+from waveform import WaveformBroadcaster
+from fanout import Fanout
+from snapshot import pack_snapshot
+from recorder import ChunkedRecorder, DiskWriter
+from jobs import JobQueue
+from registry import ModelRegistry
+from dsp import eeg_filter, group_delay_ms, IncrementalWelch, Decimator, OverlapStream, WindowStream
+from training import (
+    FS, ADC_MAX, VREF, LOWCUT, HIGHCUT, NOTCH, Q, WINDOW_SEC, STEP_SEC, ALPHA_BAND,
+    MODEL_FEATURES, FEATURE_COLUMNS, FEATURE_FMT, DECIMATE, DSP_FS, DSP_UP, DSP_DOWN,
+    DSP_NPERSEG, DSP_NOVERLAP, RECORD_CHUNK, MODEL_CONFIG, TRAIN_FILTER,
+    DATA_DIR, CALIBRATION_DIR, PIPELINE_DIR, MODEL_DIR, RESULTS_DIR,
+    FEATURE_BANK, MODEL_FEATURE_INDEX, filter_eeg, DECIMATOR, calibration_signal, session_meta,
+    window_features, process_calibration_file, train_model,
+)
 import json
-from datetime import datetime
+from collections import deque
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'eeg-monitor-secret-key'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=True, engineio_logger=True)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
 
 # ==================== GLOBAL SETTINGS ====================
-FS = 250                    # Sampling rate (Hz)
-ADC_MAX = 4095
-VREF = 3.3
+# Sampling, filter, feature, model and path settings are shared with the
+# offline jobs and live in training.py
+SERIAL_FORMAT = "auto"      # "binary" frames, legacy "ascii" lines, or detect
+READ_CHUNK_SEC = 0.02       # Reader blocks until ~this much data is in (<= 50 wakeups/s)
 
-LOWCUT = 0.5
-HIGHCUT = 40
-NOTCH = 50
-Q = 30
+# Live filter mode:
+#   "zero_phase" - filter each window from scratch, forward-backward
+#   "causal"     - filter every sample once on arrival with carried state and
+#                  cut windows from the filtered ring; much cheaper per hop but
+#                  delays the signal by ~12 ms (alpha) / ~13 ms (beta)
+FILTER_MODE = "zero_phase"
 
-WINDOW_SEC = 2.0
-STEP_SEC = 0.5
+# Live worker pipeline: serial reader -> samples queue -> DSP/inference
+# worker -> emit queue -> socket.io emitter. (size, policy) per queue, where
+# the policy for a full queue is "drop_oldest", "block" or "coalesce". The
+# serial reader never waits: under "block" it drops the chunk instead.
+# Coalescing sample chunks concatenates them, so no samples are lost
+SAMPLES_QUEUE = (256, "coalesce")
+EMIT_QUEUE = (1024, "block")
 
-ALPHA_BAND = (8, 13)
-BETA_BAND = (13, 30)
+# Live waveform is sent as batched float32 frames, this many per second.
+# Each client reports its plot width/span; when that is coarser than the
+# sample rate it gets min/max envelopes instead (DISPLAY_* until it does)
+DISPLAY_FPS = 30
+DISPLAY_WIDTH = 1000        # px
+DISPLAY_SECONDS = 4.0
 
-# Paths
-DATA_DIR = "data"
-CALIBRATION_DIR = os.path.join(DATA_DIR, "calibration")
-PIPELINE_DIR = os.path.join(DATA_DIR, "pipeline_output")
-MODEL_DIR = os.path.join(DATA_DIR, "models")
-RESULTS_DIR = os.path.join(DATA_DIR, "results")
+# Waveform frames are thinned, then skipped, for a client with this many
+# packets still unsent (predictions always go out). The kernel send buffer
+# per client is capped too, otherwise it soaks up minutes of waveform
+# before a stalled browser shows any backlog (eventlet server only)
+FANOUT_MAX_PENDING = 16
+CLIENT_SEND_BUFFER = 16384  # bytes
+
+# Late joiners get the last SNAPSHOT_SECONDS of signal and the last
+# PREDICTION_HISTORY predictions on connect. SNAPSHOT_MAX_SECONDS is the
+# longest span the dashboard offers (its waveform span selector); longer
+# requests are cut to it (reported back). A snapshot can cover 3/4 of a
+# ring, so the raw (and causal filtered) rings hold SIGNAL_BUFFER_SEC
+SNAPSHOT_SECONDS = 4.0
+SNAPSHOT_MAX_SECONDS = 30.0
+SIGNAL_BUFFER_SEC = SNAPSHOT_MAX_SECONDS * 4 / 3
+PREDICTION_HISTORY = 50
+
+# Calibration features are extracted while recording. The offline
+# whole-file filter runs on blocks of CALIBRATION_BLOCK_SEC with
+# CALIBRATION_MARGIN_SEC of context on each side, which matches filtering
+# the finished file to ~1e-5 (features lag the signal by block + margin;
+# the rest is done the moment recording stops)
+CALIBRATION_BLOCK_SEC = 2.0
+CALIBRATION_MARGIN_SEC = 8.0
+
+# Training and reprocessing run as jobs in this many worker processes,
+# off the request threads and the live pipeline
+JOB_WORKERS = 2
+
+# Every trained model is kept as a version under data/models/versions. New
+# versions are preloaded as they appear; with MODEL_FOLLOW_LATEST the
+# running predictor switches to them between two hops, unless a version
+# was picked through /api/models/activate (pinned)
+MODEL_WATCH_SEC = 2.0
+MODEL_FOLLOW_LATEST = True
 
+# Paths
 for directory in [DATA_DIR, CALIBRATION_DIR, PIPELINE_DIR, MODEL_DIR, RESULTS_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 # ==================== GLOBAL STATE ====================
+def merge_chunks(old, new):
+    """Coalesce two queued sample chunks into one (nothing is lost)"""
+    return (np.concatenate([old[0], new[0]]), np.concatenate([old[1], new[1]]), new[2], new[3])
+
 class AppState:
     def __init__(self):
         self.serial_port = None
+        self.parser = None  # decodes serial bytes to ADC samples
         self.is_recording = False
         self.is_predicting = False
         self.recording_mode = None  # 'calm' or 'not_calm'
-        self.buffer = deque(maxlen=int(FS * 10))  # 10 second buffer
-        self.recording_data = []
-        self.model = None
-        self.scaler = None
-        self.prediction_buffer = deque(maxlen=int(WINDOW_SEC * FS))
-        self.last_step_index = 0
+        self.buffer = RingBuffer(int(FS * SIGNAL_BUFFER_SEC))
+        self.disk_writer = DiskWriter()  # one thread writes every recording file, in order
+        # Raw and filtered sessions are session files (session.py), features stay CSV
+        self.recorder = ChunkedRecorder(self.disk_writer, ["ADC"], ["<u2"], RECORD_CHUNK)
+        self.filtered_recorder = ChunkedRecorder(self.disk_writer, ["Filtered_Voltage"], ["<f4"], RECORD_CHUNK)
+        self.features_recorder = ChunkedRecorder(self.disk_writer, FEATURE_COLUMNS, FEATURE_FMT, 64)
+        self.calibration = None  # feature extraction of the session being recorded (DSP worker)
+        self.jobs = JobQueue(JOB_WORKERS, on_update=lambda job: queue_emit('job_progress', job))
+        self.registry = ModelRegistry(MODEL_DIR, config=MODEL_CONFIG)  # registry.active: version used per hop
+        self.pinned_model = None  # version picked by the user; None follows the latest
+        # Two windows of headroom so a late hop can still read its window
+        self.prediction_buffer = RingBuffer(int(WINDOW_SEC * FS) * 2)
+        # Causal mode only: prediction windows and late-joiner snapshots
+        self.filtered_buffer = RingBuffer(int(DSP_FS * max(SIGNAL_BUFFER_SEC, 2 * WINDOW_SEC)))
+        self.filtered_delay = 0.0  # s the causal filter + decimator lag the raw signal
+        self.stream_filter = None
+        self.decimator = None  # streaming resampler to DSP_FS (causal mode)
+        self.spectral = None  # IncrementalWelch for the causal ring
+        self.scheduler = HopScheduler()  # runs windowed consumers once per hop
+        # Blocking reader that parks while disconnected (under eventlet its
+        # reads run on a real OS thread from eventlet.tpool, off the hub)
+        self.ingest = SerialIngest(FS, READ_CHUNK_SEC, green=ASYNC_MODE == 'eventlet')
+        self.ingest_counters = self.ingest.counters()  # last /api/ingest snapshot
+        self.samples_queue = BoundedQueue('samples', *SAMPLES_QUEUE, merge=merge_chunks)
+        self.emit_queue = BoundedQueue('emit', *EMIT_QUEUE)
+        self.waveform = WaveformBroadcaster(FS, DISPLAY_FPS, lambda *message: self.emit_queue.put(message),
+                                            DISPLAY_WIDTH, DISPLAY_SECONDS)
+        self.fanout = Fanout(socketio.server, max_pending=FANOUT_MAX_PENDING)  # per-client thinning
+        self.predictions = deque(maxlen=PREDICTION_HISTORY)  # rows for late-joiner snapshots
+        self.recording_t0 = None  # session time of the first recorded sample
+        # Held while a chunk is recorded and queued, and while a session starts
+        # or stops, so the raw file and the DSP worker cut at the same chunk
+        self.recording_lock = threading.Lock()
+        self.session_base = None  # buffer.total at the first sample of the session
+        self.filtered_base = None  # filtered_buffer.total likewise (causal mode)
         
 state = AppState()
 
-# ==================== FILTER FUNCTIONS ====================
-def bandpass(data):
-    """Apply bandpass filter"""
-    nyq = 0.5 * FS
-    b, a = butter(4, [LOWCUT/nyq, HIGHCUT/nyq], btype="band")
-    return filtfilt(b, a, data)
-
-def notch_filter(data):
-    """Apply notch filter"""
-    nyq = 0.5 * FS
-    b, a = iirnotch(NOTCH/nyq, Q)
-    return filtfilt(b, a, data)
-
-def band_power(freqs, psd, band):
-    """Calculate power in frequency band"""
-    idx = np.logical_and(freqs >= band[0], freqs <= band[1])
-    return np.trapz(psd[idx], freqs[idx])
-
-# ==================== PROCESSING FUNCTIONS ====================
-def process_calibration_file(filename, label):
-    """Process a calibration file through the pipeline"""
-    print(f"Processing: {filename}")
-    
-    # Load raw data
-    df = pd.read_csv(os.path.join(CALIBRATION_DIR, filename))
-    adc = df["ADC"].values
-    time_vals = df["Time(s)"].values
-    
-    # Convert ADC to voltage
+def raw_recording(label):
+    """File name of a label's raw recording (a session file, or an older CSV), or None"""
+    for filename in (f"{label}_raw.eeg", f"{label}_raw.csv"):
+        if os.path.exists(os.path.join(CALIBRATION_DIR, filename)):
+            return filename
+    return None
+
+def queue_emit(event, data, to=None):
+    """Hand a socket.io message to the emission worker"""
+    state.emit_queue.put((event, data, to))
+
+def handle_samples(adc):
+    """Acquisition stage: buffer and record a chunk, pass it on to the DSP worker"""
     voltage = (adc / ADC_MAX) * VREF
-    
-    # Filtering
-    filtered = notch_filter(bandpass(voltage))
-    
-    # Save filtered EEG
-    filtered_df = pd.DataFrame({
-        "Time(s)": time_vals,
-        "Filtered_Voltage": filtered
-    })
-    filtered_df.to_csv(
-        os.path.join(PIPELINE_DIR, f"{label}_filtered.csv"),
-        index=False
-    )
-    
-    # Sliding window feature extraction
-    window_size = int(WINDOW_SEC * FS)
-    step_size = int(STEP_SEC * FS)
-    
-    # Calculate appropriate nperseg (must be <= window_size)
-    nperseg = min(256, window_size)
-    
-    features = []
-    window_id = 1
-    
-    for start in range(0, len(filtered) - window_size, step_size):
-        window = filtered[start:start + window_size]
-        
-        freqs, psd = welch(window, FS, nperseg=nperseg)
+    state.buffer.extend(voltage)
+    now = time.time()
+    
+    with state.recording_lock:
+        # If recording, save data (here, so a slow downstream can never lose any)
+        recording = state.is_recording
+        if recording:
+            if state.recording_t0 is None:
+                state.recording_t0 = now - state.recording_start_time - (len(adc) - 1) / FS
+            state.recorder.append(adc)
         
-        alpha = band_power(freqs, psd, ALPHA_BAND)
-        beta = band_power(freqs, psd, BETA_BAND)
+        # Never wait on the DSP worker: a full queue drops or coalesces instead
+        if recording or state.is_predicting:
+            state.samples_queue.put((adc, voltage, now, state.buffer.total), timeout=0)
+
+def process_chunk(chunk, stats):
+    """DSP stage: feed the waveform display and the predictor a chunk of samples"""
+    if callable(chunk):
+        return chunk()  # session start/end marker, in order with the samples
+    adc, voltage, now, end = chunk
+    n = len(voltage)
+    if state.session_base is None:
+        state.session_base = end - n  # snapshot times count from here
+    
+    # Chunks queued before stop_recording still belong to the session
+    session = state.calibration
+    if session is not None:
+        if session['t0'] is None:
+            session['t0'] = now - session['start_time'] - (n - 1) / FS
+        extract_calibration(session, session['stream'].push(voltage))
+    
+    if state.is_recording:
+        # Raw waveform goes out in batched frames
+        state.waveform.push(voltage)
+    
+    # If predicting, process windows
+    elif state.is_predicting and state.registry.active:
+        # The scheduler counts samples of the buffer windows are cut from
+        # (raw prediction_buffer, or the filtered ring at DSP_FS in causal
+        # mode), so hop `end` indices address that buffer directly
+        state.prediction_buffer.extend(voltage)
+        if FILTER_MODE == "causal":
+            filtered = state.decimator.step(state.stream_filter.step(voltage))
+            if state.filtered_base is None:
+                state.filtered_base = state.filtered_buffer.total
+            state.filtered_buffer.extend(filtered)
+            new_samples = len(filtered)
+        else:
+            new_samples = n
         
-        if beta == 0:
-            continue
+        state.waveform.push(voltage)
+        stats['samples'] += n
         
-        ratio = alpha / beta
+        # Print status every 5 seconds (less spam)
+        if now - stats['last_print'] >= 5.0:
+            counters = state.ingest.counters()
+            ingest = SerialIngest.rates(stats['ingest'], counters)
+            print(f"[Status] Rate: {stats['samples']/5:.1f} Hz, Buffer: {len(state.prediction_buffer)}, Predictions: {stats['predictions']}, "
+                  f"Wakeups: {ingest['wakeups_per_sec']:.0f}/s, Reader CPU: {ingest['reader_cpu_percent']:.1f}%, "
+                  f"Queues: samples={len(state.samples_queue)} emit={len(state.emit_queue)}")
+            stats['ingest'] = counters
+            stats['samples'] = 0
+            stats['predictions'] = 0
+            stats['last_print'] = now
         
-        features.append([window_id, alpha, beta, ratio])
-        window_id += 1
-    
-    # Save features
-    feature_df = pd.DataFrame(
-        features,
-        columns=["Window", "Alpha", "Beta", "AlphaBetaRatio"]
-    )
-    
-    feature_df.to_csv(
-        os.path.join(PIPELINE_DIR, f"{label}_features.csv"),
-        index=False
-    )
-    
-    return len(feature_df)
+        # Run any windowed consumer whose hop is complete
+        for name, result in state.scheduler.advance(new_samples):
+            if name == 'prediction' and result:
+                stats['predictions'] += 1
 
-def train_model():
-    """Train the ML model on calibration data"""
-    # Check if feature files exist
-    calm_path = os.path.join(PIPELINE_DIR, "calm_features.csv")
-    not_calm_path = os.path.join(PIPELINE_DIR, "not_calm_features.csv")
-    
-    if not os.path.exists(calm_path) or not os.path.exists(not_calm_path):
-        return False, "Missing calibration data. Please collect both calm and not calm sessions first."
-    
-    # Load features
-    calm = pd.read_csv(calm_path)
-    not_calm = pd.read_csv(not_calm_path)
-    
-    # Add labels
-    calm["Label"] = "Calm"
-    not_calm["Label"] = "Not Calm"
-    
-    # Combine and shuffle
-    data = pd.concat([calm, not_calm], ignore_index=True)
-    data = data.sample(frac=1, random_state=42).reset_index(drop=True)
-    
-    # Features and labels
-    X = data[["Alpha", "Beta", "AlphaBetaRatio"]].values
-    y = data["Label"].values
-    
-    # Scale features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-    # Train/test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_scaled, y, test_size=0.3, random_state=42, stratify=y
-    )
-    
-    # Train model
-    model = LogisticRegression(max_iter=1000, class_weight="balanced")
-    model.fit(X_train, y_train)
-    
-    # Evaluate
-    y_pred = model.predict(X_test)
-    accuracy = (y_pred == y_test).mean()
-    
-    # Save model and scaler
-    joblib.dump(model, os.path.join(MODEL_DIR, "model.pkl"))
-    joblib.dump(scaler, os.path.join(MODEL_DIR, "scaler.pkl"))
-    
-    # Save training report
-    report = classification_report(y_test, y_pred)
-    with open(os.path.join(MODEL_DIR, "training_report.txt"), "w") as f:
-        f.write("EEG CALMNESS MODEL TRAINING REPORT\n")
-        f.write("=" * 50 + "\n\n")
-        f.write(f"Training Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total Samples: {len(data)}\n")
-        f.write(f"Calm Samples: {len(calm)}\n")
-        f.write(f"Not Calm Samples: {len(not_calm)}\n")
-        f.write(f"Test Accuracy: {accuracy:.2%}\n\n")
-        f.write("Classification Report:\n")
-        f.write(report)
-    
-    return True, f"Model trained successfully! Accuracy: {accuracy:.2%}"
+def begin_calibration(label, start_time):
+    """DSP worker: start extracting features of a new calibration session"""
+    state.calibration = {
+        'label': label,
+        'start_time': start_time,
+        't0': None,  # session time of the first sample
+        'stream': OverlapStream(calibration_signal, int(CALIBRATION_MARGIN_SEC * FS),
+                                int(CALIBRATION_BLOCK_SEC * FS), DSP_UP, DSP_DOWN),
+        'windows': WindowStream(int(WINDOW_SEC * DSP_FS), int(STEP_SEC * DSP_FS)),
+        'features': 0,
+    }
+    state.filtered_recorder.open(os.path.join(PIPELINE_DIR, f"{label}_filtered.eeg"),
+                                 session_meta(DSP_FS, start_time, True))
+    state.features_recorder.open(os.path.join(PIPELINE_DIR, f"{label}_features.csv"))
+
+def extract_calibration(session, filtered):
+    """DSP worker: save newly settled filtered samples and the windows they complete"""
+    if len(filtered) == 0:
+        return
+    state.filtered_recorder.append(filtered)
+    
+    values = window_features(session['windows'].push(filtered))
+    if len(values) == 0:
+        return
+    numbers = session['features'] + 1 + np.arange(len(values))
+    state.features_recorder.append(numbers, *values.T)
+    session['features'] += len(values)
+    queue_emit('calibration_progress', {'mode': session['label'], 'windows': session['features']})
+
+def finish_calibration(samples):
+    """DSP worker, after the session's last chunk: flush the filter tail and close the files"""
+    session, state.calibration = state.calibration, None
+    filename = f"{session['label']}_raw.eeg"
+    try:
+        extract_calibration(session, session['stream'].finish())
+        result = {'success': True, 'filename': filename,
+                  'message': f"Saved {samples} samples, extracted {session['features']} windows"}
+    except Exception as e:
+        # e.g. too short for the filter
+        result = {'success': False, 'filename': filename,
+                  'message': f'Error processing data: {str(e)}'}
+    
+    # Reported once the files are in place (the writer keeps them in order);
+    # a failed session leaves the previous feature files alone
+    failed = not result['success']
+    state.filtered_recorder.close(discard=failed, meta={'t0': session['t0']})
+    state.features_recorder.close(lambda path, rows: queue_emit('recording_saved', result), discard=failed)
+    if failed:
+        queue_emit('recording_saved', result)
 
 def serial_reader_thread():
     """Background thread to read serial data"""
-    samples_received = 0
-    last_print_time = time.time()
-    prediction_count = 0
-    
-    while True:
-        try:
-            if state.serial_port and state.serial_port.is_open:
-                try:
-                    if state.serial_port.in_waiting:
-                        raw = state.serial_port.readline().decode(errors="ignore").strip()
-                        if raw.isdigit():
-                            adc_value = int(raw)
-                            voltage = (adc_value / ADC_MAX) * VREF
-                            
-                            state.buffer.append(voltage)
-                            
-                            # If recording, save data
-                            if state.is_recording:
-                                t = time.time() - state.recording_start_time
-                                state.recording_data.append([t, adc_value])
-                                
-                                # Emit raw waveform data
-                                socketio.emit('waveform_data', {
-                                    'time': t,
-                                    'voltage': voltage,
-                                    'mode': 'recording'
-                                })
-                            
-                            # If predicting, process windows
-                            elif state.is_predicting and state.model:
-                                state.prediction_buffer.append(voltage)
-                                samples_received += 1
-                                
-                                # Print status every 5 seconds (less spam)
-                                if time.time() - last_print_time >= 5.0:
-                                    print(f"[Status] Rate: {samples_received/5:.1f} Hz, Buffer: {len(state.prediction_buffer)}, Predictions: {prediction_count}")
-                                    samples_received = 0
-                                    prediction_count = 0
-                                    last_print_time = time.time()
-                                
-                                # Emit raw waveform (throttle to every 10th sample to reduce load)
-                                if samples_received % 10 == 0:
-                                    socketio.emit('waveform_data', {
-                                        'time': time.time() - state.prediction_start_time,
-                                        'voltage': voltage,
-                                        'mode': 'prediction'
-                                    })
-                                
-                                # Process window
-                                result = process_prediction_window()
-                                if result:
-                                    prediction_count += 1
-                                
-                except Exception as e:
-                    if state.serial_port:  # Only print if we expect a connection
-                        print(f"Serial read error: {e}")
-            
-            time.sleep(0.001)  # Small delay to prevent CPU hogging
-            
-        except Exception as e:
-            # Catch any outer exceptions to keep thread alive
-            time.sleep(0.1)
-
-def process_prediction_window():
-    """Process a window for prediction"""
-    window_size = int(WINDOW_SEC * FS)  # 500 samples
-    step_size = int(STEP_SEC * FS)      # 125 samples
+    # Blocks in the serial driver (or parks while disconnected) instead of
+    # polling; each wakeup hands one decoded chunk to handle_samples
+    state.ingest.run(handle_samples)
+
+def dsp_worker_thread():
+    """Background thread for filtering, features and inference"""
+    stats = {'samples': 0, 'predictions': 0, 'last_print': time.time(),
+             'ingest': state.ingest.counters()}
+    run_stage(state.samples_queue, lambda chunk: process_chunk(chunk, stats))
+
+def filter_mismatch(loaded):
+    """Warning when a model's training features were filtered unlike the live ones, else None"""
+    trained = loaded.meta.get('train_filter', TRAIN_FILTER)
+    if trained == FILTER_MODE:
+        return None
+    return (f"Model {loaded.version} was trained on {trained} filtered features, "
+            f"live prediction filters {FILTER_MODE}; predictions may be less accurate")
+
+def model_loaded(loaded):
+    """Registry watcher: a new version is preloaded; switch to it if following"""
+    print(f"[Models] Preloaded {loaded.version}")
+    if MODEL_FOLLOW_LATEST and state.pinned_model is None and state.is_predicting:
+        state.registry.activate(loaded.version)  # cached: a reference swap
+        print(f"[Models] Predicting with {loaded.version}")
+        warning = filter_mismatch(loaded)
+        if warning:
+            print(f"[Models] WARNING: {warning}")
+        queue_emit('model_changed', {'version': loaded.version})
+
+def warm_up():
+    """Load scipy.signal and design the live filter once the socket is up,
+    so the first connect or hop does not pay for it"""
+    started = time.time()
+    eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q)
+    print(f"[Startup] DSP ready in {(time.time() - started) * 1000:.0f} ms")
+
+def emission_worker_thread():
+    """Background thread that sends queued socket.io messages"""
+    run_stage(state.emit_queue, lambda message: state.fanout.send(*message))
+
+def process_prediction_window(end):
+    """Process the window ending at absolute sample index `end` for prediction"""
+    current = state.registry.active  # one version for the whole hop, even mid-swap
+    if FILTER_MODE == "causal":
+        source, window_size = state.filtered_buffer, int(WINDOW_SEC * DSP_FS)
+    else:
+        source, window_size = state.prediction_buffer, int(WINDOW_SEC * FS)  # 500 samples
     
-    current_buffer_size = len(state.prediction_buffer)
+    try:
+        window = source.latest(window_size, end)
+    except IndexError:
+        return False  # window already fell out of the buffer
     
-    if current_buffer_size >= window_size:
-        # Calculate how many samples since last prediction
-        samples_since_last = current_buffer_size - state.last_step_index
+    # Filter (causal mode samples were already filtered on arrival)
+    try:
+        filtered = window if FILTER_MODE == "causal" else DECIMATOR.apply(filter_eeg(window))
+        
+        # Extract features (the causal ring never changes a sample once
+        # written, so segment FFTs can be shared between windows)
+        if FILTER_MODE == "causal":
+            freqs, psd = state.spectral.psd(filtered, end - window_size)
+        else:
+            from scipy.signal import welch
+            freqs, psd = welch(filtered, DSP_FS, nperseg=min(DSP_NPERSEG, len(filtered)),
+                               noverlap=DSP_NOVERLAP)
+        values = FEATURE_BANK.compute(psd)
+        bank = dict(zip(FEATURE_BANK.names, values))
+        alpha = bank["Alpha"]
+        beta = bank["Beta"]
         
-        # Only process if we have a full step (125 samples) of new data
-        if samples_since_last >= step_size:
-            # Update the index to current position minus step
-            state.last_step_index = current_buffer_size - step_size
+        if beta > 0:
+            ratio = alpha / beta
             
-            # Get window
-            window = np.array(list(state.prediction_buffer)[-window_size:])
+            # Predict
+            prediction, confidence = current.scorer.predict_one(values[MODEL_FEATURE_INDEX])
             
-            # Filter
-            try:
-                filtered = notch_filter(bandpass(window))
-                
-                # Calculate appropriate nperseg
-                nperseg = min(256, len(filtered))
-                
-                # Extract features
-                freqs, psd = welch(filtered, FS, nperseg=nperseg)
-                alpha = band_power(freqs, psd, ALPHA_BAND)
-                beta = band_power(freqs, psd, BETA_BAND)
-                
-                if beta > 0:
-                    ratio = alpha / beta
-                    
-                    # Predict
-                    features = np.array([[alpha, beta, ratio]])
-                    features_scaled = state.scaler.transform(features)
-                    prediction = state.model.predict(features_scaled)[0]
-                    probability = state.model.predict_proba(features_scaled)[0]
-                    
-                    # Get probability for predicted class
-                    pred_idx = 0 if prediction == "Calm" else 1
-                    confidence = probability[pred_idx]
-                    
-                    print(f"[Prediction] {prediction} | α={alpha:.2e} β={beta:.2e} ratio={ratio:.3f} conf={confidence:.1%}")
-                    
-                    # Emit prediction
-                    prediction_data = {
-                        'time': time.time() - state.prediction_start_time,
-                        'alpha': float(alpha),
-                        'beta': float(beta),
-                        'ratio': float(ratio),
-                        'state': prediction,
-                        'confidence': float(confidence)
-                    }
-                    
-                    print(f"[WebSocket] Emitting prediction_data: {prediction_data['state']}")
-                    socketio.emit('prediction_data', prediction_data)
-                    
-                    return True  # Successfully made prediction
-                    
-            except Exception as e:
-                print(f"Prediction error: {e}")
-                import traceback
-                traceback.print_exc()
-    
+            print(f"[Prediction] {prediction} | α={alpha:.2e} β={beta:.2e} ratio={ratio:.3f} conf={confidence:.1%}")
+            
+            # Emit prediction
+            prediction_data = {
+                'time': time.time() - state.prediction_start_time,
+                'alpha': float(alpha),
+                'beta': float(beta),
+                'ratio': float(ratio),
+                'state': prediction,
+                'confidence': float(confidence),
+                'model': current.version
+            }
+            
+            state.predictions.append((prediction_data['time'], alpha, beta, ratio,
+                                      prediction == "Calm", confidence))
+            
+            print(f"[WebSocket] Emitting prediction_data: {prediction_data['state']}")
+            queue_emit('prediction_data', prediction_data)
+            
+            return True  # Successfully made prediction
+            
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        import traceback
+        traceback.print_exc()
+
     return False  # No prediction made
 
+def build_snapshot(seconds=SNAPSHOT_SECONDS):
+    """Last `seconds` of raw/filtered signal and recent predictions as one blob"""
+    mode = 'recording' if state.is_recording else 'prediction' if state.is_predicting else None
+    
+    # Copied from the live rings without stopping acquisition
+    start, raw = state.buffer.snapshot(int(seconds * FS))
+    base = state.session_base if mode else None
+    if base is None:
+        base = start + len(raw)  # idle: times end at 0
+    raw_t0 = (start - base) / FS
+    
+    if mode == 'prediction' and FILTER_MODE == "causal" and state.filtered_base is not None:
+        filtered_start, filtered = state.filtered_buffer.snapshot(int(seconds * DSP_FS))
+        # Shifted back by the causal delay, to line up with the raw signal
+        filtered_t0 = (filtered_start - state.filtered_base) / DSP_FS - state.filtered_delay
+    else:
+        try:
+            filtered = DECIMATOR.apply(filter_eeg(raw))
+        except ValueError:
+            filtered = np.empty(0)  # too short to filter yet
+        filtered_t0 = raw_t0
+    
+    return pack_snapshot(mode, FS, raw, raw_t0, DSP_FS, filtered, filtered_t0,
+                         list(state.predictions), time.time())
+
 # ==================== WEBSOCKET HANDLERS ====================
 @socketio.on('connect')
 def handle_connect():
@@ -354,6 +459,28 @@ def handle_connect():
     print("WebSocket CLIENT CONNECTED")
     print(f"{'='*60}\n")
     emit('connection_response', {'data': 'Connected to EEG Monitor'})
+    join_room(state.waveform.view(request.sid))  # default view until the client sends its own
+
+@socketio.on('waveform_view')
+def handle_waveform_view(data):
+    """Client plot width (px) and visible span (s), to size waveform envelopes"""
+    old_room = state.waveform.room_of(request.sid)
+    room = state.waveform.view(request.sid, data.get('width'), data.get('seconds'))
+    if old_room and old_room != room:
+        leave_room(old_room)
+    join_room(room)
+
+def snapshot_span(seconds):
+    """Requested snapshot length clamped to what the rings hold"""
+    return min(max(seconds, 0.5), SNAPSHOT_MAX_SECONDS)
+
+@socketio.on('snapshot')
+def handle_snapshot(data=None):
+    """Binary snapshot for a (re)connecting client, returned as the ack
+    (with the span actually covered, in case it was cut)"""
+    requested = float((data or {}).get('seconds', SNAPSHOT_SECONDS))
+    seconds = snapshot_span(requested)
+    return build_snapshot(seconds), {'seconds': seconds, 'requested': requested}
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -361,6 +488,8 @@ def handle_disconnect():
     print(f"\n{'='*60}")
     print("WebSocket CLIENT DISCONNECTED")
     print(f"{'='*60}\n")
+    state.waveform.drop(request.sid)
+    state.fanout.drop(request.sid)
 
 # ==================== ROUTES ====================
 @app.route('/')
@@ -380,10 +509,13 @@ def connect_port():
     port = data.get('port')
     
     try:
+        state.ingest.detach()
         if state.serial_port and state.serial_port.is_open:
             state.serial_port.close()
         
+        state.parser = make_parser(SERIAL_FORMAT)
         state.serial_port = serial.Serial(port, 115200, timeout=1)
+        state.ingest.attach(state.serial_port, state.parser)
         time.sleep(2)  # Wait for connection to stabilize
         
         return jsonify({'success': True, 'message': f'Connected to {port}'})
@@ -394,6 +526,7 @@ def connect_port():
 def disconnect_port():
     """Disconnect serial port"""
     try:
+        state.ingest.detach()
         if state.serial_port and state.serial_port.is_open:
             state.serial_port.close()
         state.serial_port = None
@@ -413,48 +546,111 @@ def start_recording():
     if state.is_recording or state.is_predicting:
         return jsonify({'success': False, 'message': 'Already recording or predicting'})
     
-    state.is_recording = True
-    state.recording_mode = mode
-    state.recording_data = []
-    state.recording_start_time = time.time()
+    state.waveform.start('recording')
+    state.session_base = None
+    with state.recording_lock:
+        state.recording_mode = mode
+        state.recording_start_time = time.time()
+        state.recording_t0 = None
+        state.recorder.open(os.path.join(CALIBRATION_DIR, f"{mode}_raw.eeg"),
+                            session_meta(FS, state.recording_start_time, False))
+        # Feature extraction starts on the DSP worker, ahead of the session's samples
+        start_time = state.recording_start_time
+        state.samples_queue.put_control(lambda: begin_calibration(mode, start_time))
+        state.is_recording = True
     
     return jsonify({'success': True, 'message': f'Recording {mode} session started'})
 
 @app.route('/api/stop_recording', methods=['POST'])
 def stop_recording():
     """Stop recording and save data"""
-    if not state.is_recording:
-        return jsonify({'success': False, 'message': 'Not currently recording'})
-    
-    state.is_recording = False
-    
-    # Save data
-    filename = f"{state.recording_mode}_raw.csv"
-    filepath = os.path.join(CALIBRATION_DIR, filename)
-    
-    df = pd.DataFrame(state.recording_data, columns=["Time(s)", "ADC"])
-    df.to_csv(filepath, index=False)
-    
-    # Process through pipeline
-    try:
-        num_windows = process_calibration_file(filename, state.recording_mode)
-        return jsonify({
-            'success': True,
-            'message': f'Saved {len(state.recording_data)} samples, extracted {num_windows} windows',
-            'filename': filename
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error processing data: {str(e)}'})
+    with state.recording_lock:
+        if not state.is_recording:
+            return jsonify({'success': False, 'message': 'Not currently recording'})
+        
+        # No chunk is between the recorder and the queue now: the last one
+        # recorded is the last one queued before the finish marker.
+        # Features were extracted while recording; the DSP worker finishes the
+        # last few seconds after the session's queued chunks, the writer thread
+        # flushes the files, then 'recording_saved' reports the result
+        state.is_recording = False
+        samples = state.recorder.close(meta={'t0': state.recording_t0 or 0.0})
+        state.samples_queue.put_control(lambda: finish_calibration(samples))
+    return jsonify({
+        'success': True,
+        'message': f'Recording stopped, saving {samples} samples...',
+        'filename': f"{state.recording_mode}_raw.eeg"
+    })
 
 @app.route('/api/train_model', methods=['POST'])
 def train_model_route():
-    """Train the ML model"""
+    """Start training the ML model as a background job"""
     try:
-        success, message = train_model()
-        return jsonify({'success': success, 'message': message})
+        job = state.jobs.submit('train', train_model)
+        return jsonify({'success': True, 'message': 'Training started', 'job': job})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Training error: {str(e)}'})
 
+@app.route('/api/reprocess', methods=['POST'])
+def reprocess():
+    """Rerun the offline pipeline on saved calibration recordings, as background jobs"""
+    mode = (request.json or {}).get('mode')  # 'calm', 'not_calm', or both
+    jobs = []
+    for label in [mode] if mode else ['calm', 'not_calm']:
+        filename = raw_recording(label)
+        if filename:
+            jobs.append(state.jobs.submit('reprocess', process_calibration_file, filename, label))
+    if not jobs:
+        return jsonify({'success': False, 'message': 'No calibration recordings to reprocess'})
+    return jsonify({'success': True, 'message': f'Reprocessing {len(jobs)} recording(s)', 'jobs': jobs})
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Recent background jobs, newest first"""
+    return jsonify({'jobs': state.jobs.list()})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Status, progress and result of one background job"""
+    job = state.jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running one at its next step"""
+    if not state.jobs.cancel(job_id):
+        return jsonify({'success': False, 'message': 'Job is not queued or running'})
+    return jsonify({'success': True, 'message': 'Cancelling job'})
+
+@app.route('/api/models')
+def list_models():
+    """Registered model versions (metadata), newest first, and the active one"""
+    versions = [state.registry.metadata(version) for version in reversed(state.registry.versions())]
+    active = state.registry.active
+    return jsonify({'versions': versions, 'active': active.version if active else None,
+                    'pinned': state.pinned_model})
+
+@app.route('/api/models/activate', methods=['POST'])
+def activate_model():
+    """Switch the live predictor to a model version (between two hops) and pin it;
+    version "latest" unpins and follows new versions again"""
+    version = (request.json or {}).get('version')
+    pin = version != 'latest'
+    if pin and version not in state.registry.versions():
+        return jsonify({'success': False, 'message': f'Unknown model version: {version}'})
+    try:
+        loaded = state.registry.activate(version if pin else None)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error loading model: {str(e)}'})
+    if loaded is None:
+        return jsonify({'success': False, 'message': 'Model not trained yet. Please train model first.'})
+    state.pinned_model = loaded.version if pin else None
+    queue_emit('model_changed', {'version': loaded.version, 'pinned': state.pinned_model})
+    message = f'Using model {loaded.version}' + (' (pinned)' if pin else ' (following the latest)')
+    return jsonify({'success': True, 'message': message})
+
 @app.route('/api/start_prediction', methods=['POST'])
 def start_prediction():
     """Start real-time prediction"""
@@ -464,30 +660,55 @@ def start_prediction():
     if state.is_recording or state.is_predicting:
         return jsonify({'success': False, 'message': 'Already recording or predicting'})
     
-    # Load model
-    model_path = os.path.join(MODEL_DIR, "model.pkl")
-    scaler_path = os.path.join(MODEL_DIR, "scaler.pkl")
-    
-    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+    if state.registry.latest() is None:
         return jsonify({'success': False, 'message': 'Model not trained yet. Please train model first.'})
     
     try:
-        state.model = joblib.load(model_path)
-        state.scaler = joblib.load(scaler_path)
-        state.is_predicting = True
+        # Usually preloaded by the registry watcher
+        if state.pinned_model:
+            state.registry.activate(state.pinned_model)
+        elif MODEL_FOLLOW_LATEST or state.registry.active is None:
+            state.registry.activate()
         state.prediction_buffer.clear()
-        state.last_step_index = 0
+        state.filtered_buffer.clear()
+        state.stream_filter = eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q)
+        state.decimator = Decimator(DSP_UP, DSP_DOWN)
+        if FILTER_MODE == "causal":
+            # Alpha-band group delay of the filter plus the resampler's delay
+            state.filtered_delay = (group_delay_ms(state.stream_filter.sos, FS, ALPHA_BAND) / 1000
+                                    + state.decimator.delay_samples / FS)
+        state.spectral = IncrementalWelch(DSP_FS, DSP_NPERSEG, int(WINDOW_SEC * DSP_FS), DSP_NOVERLAP,
+                                          int(STEP_SEC * DSP_FS))
+        # Causal windows are cut from the filtered ring, which runs at DSP_FS
+        rate = DSP_FS if FILTER_MODE == "causal" else FS
+        state.scheduler.register('prediction', int(WINDOW_SEC * rate), int(STEP_SEC * rate),
+                                 process_prediction_window)
+        state.predictions.clear()
+        state.session_base = None
+        state.filtered_base = None
         state.prediction_start_time = time.time()
+        state.waveform.start('prediction')
+        state.is_predicting = True
         
         print("\n" + "="*60)
         print("PREDICTION MODE STARTED")
         print("="*60)
-        print(f"Model loaded: {model_path}")
+        print(f"Model version: {state.registry.active.version}")
+        warning = filter_mismatch(state.registry.active)
+        if warning:
+            print(f"WARNING: {warning}")
+        if FILTER_MODE == "causal":
+            print(f"Filter mode: causal (alpha-band delay {state.filtered_delay * 1000:.1f} ms)")
+        else:
+            print("Filter mode: zero-phase")
+        if DECIMATE:
+            print(f"Decimation: {FS} Hz -> {DSP_FS} Hz before spectral analysis")
         print(f"Waiting for {WINDOW_SEC} seconds of data before first prediction...")
         print("Predictions will update every 0.5 seconds after initial window is filled.")
         print("="*60 + "\n")
         
-        return jsonify({'success': True, 'message': 'Prediction started - collecting data for first window (2 seconds)...'})
+        return jsonify({'success': True, 'message': 'Prediction started - collecting data for first window (2 seconds)...',
+                        'warning': warning})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading model: {str(e)}'})
 
@@ -498,8 +719,7 @@ def stop_prediction():
         return jsonify({'success': False, 'message': 'Not currently predicting'})
     
     state.is_predicting = False
-    state.model = None
-    state.scaler = None
+    state.scheduler.unregister('prediction')
     
     return jsonify({'success': True, 'message': 'Prediction stopped'})
 
@@ -512,16 +732,62 @@ def get_status():
         'recording': state.is_recording,
         'recording_mode': state.recording_mode,
         'predicting': state.is_predicting,
-        'has_model': os.path.exists(os.path.join(MODEL_DIR, "model.pkl")),
-        'has_calm_data': os.path.exists(os.path.join(CALIBRATION_DIR, "calm_raw.csv")),
-        'has_not_calm_data': os.path.exists(os.path.join(CALIBRATION_DIR, "not_calm_raw.csv"))
+        'has_model': state.registry.latest() is not None,
+        'model_version': state.registry.active.version if state.registry.active else None,
+        'has_calm_data': raw_recording('calm') is not None,
+        'has_not_calm_data': raw_recording('not_calm') is not None
     })
 
+@app.route('/api/ingest')
+def get_ingest():
+    """Serial reader wakeups/s, sample rate and CPU use since the last call"""
+    counters = state.ingest.counters()
+    rates = SerialIngest.rates(state.ingest_counters, counters)
+    state.ingest_counters = counters
+    return jsonify(dict(rates, wakeups=counters['wakeups'], samples=counters['samples'],
+                        format=state.parser.format if state.parser else None))
+
+@app.route('/api/pipeline')
+def get_pipeline():
+    """Depth and drop/coalesce counters of each worker pipeline queue, and fan-out thinning"""
+    stats = {queue.name: queue.stats() for queue in (state.samples_queue, state.emit_queue)}
+    stats['fanout'] = state.fanout.stats()
+    return jsonify(stats)
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    """Binary snapshot of the last ?seconds= of signal and recent predictions (see snapshot.py)"""
+    requested = request.args.get('seconds', SNAPSHOT_SECONDS, type=float)
+    seconds = snapshot_span(requested)
+    response = Response(build_snapshot(seconds), mimetype='application/octet-stream')
+    response.headers['X-Snapshot-Seconds'] = str(seconds)
+    response.headers['X-Snapshot-Requested'] = str(requested)
+    return response
+
 # ==================== MAIN ====================
 if __name__ == '__main__':
-    # Start serial reader thread
-    reader_thread = threading.Thread(target=serial_reader_thread, daemon=True)
-    reader_thread.start()
+    # Child run of --profile-startup: stop once the socket listens
+    probe = '--startup-probe' in sys.argv
+    if probe:
+        import startup
+        startup.mark('main')
+    
+    # A model trained before versioning becomes the first version
+    legacy_model = os.path.join(MODEL_DIR, "model.pkl")
+    legacy_scaler = os.path.join(MODEL_DIR, "scaler.pkl")
+    if state.registry.latest() is None and os.path.exists(legacy_model) and os.path.exists(legacy_scaler):
+        import joblib
+        state.registry.save(joblib.load(legacy_model), joblib.load(legacy_scaler),
+                            {'features': MODEL_FEATURES, 'imported_from': legacy_model})
+    if probe:
+        startup.mark('models')
+    
+    # Start serial reader, DSP, waveform, emission, recording writer, job progress
+    # and model watcher threads
+    watch_models = lambda: state.registry.watch(MODEL_WATCH_SEC, model_loaded)
+    for stage in (serial_reader_thread, dsp_worker_thread, state.waveform.run, emission_worker_thread,
+                  state.disk_writer.run, state.jobs.run, watch_models):
+        threading.Thread(target=stage, daemon=True).start()
     
     print("\n" + "="*60)
     print("EEG CALMNESS MONITOR - Web Application")
@@ -529,4 +795,20 @@ if __name__ == '__main__':
     print("\nOpen your browser and navigate to: http://localhost:5000")
     print("\nPress CTRL+C to stop the server\n")
     
-    socketio.run(app, debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if ASYNC_MODE == 'eventlet':
+        # Same server socketio.run() starts, with capped client send buffers
+        listener = eventlet.listen(('0.0.0.0', 0 if probe else 5000))
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CLIENT_SEND_BUFFER)
+        if probe:
+            startup.ready()
+        threading.Thread(target=warm_up, daemon=True).start()
+        eventlet.wsgi.server(listener, app, log_output=False)
+    else:
+        # The werkzeug server socketio.run() starts, created here so the
+        # probe can report the moment its own socket listens
+        from werkzeug.serving import make_server
+        server = make_server('0.0.0.0', 0 if probe else 5000, app, threaded=True)
+        if probe:
+            startup.ready()
+        threading.Thread(target=warm_up, daemon=True).start()
+        server.serve_forever()
\ No newline at end of file
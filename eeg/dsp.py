@@ -0,0 +1,560 @@
+"""
+EEG Calmness Monitor - Signal Processing
+Filter design cache, reusable second-order-section filters, decimation,
+blockwise streaming and spectral estimation/features
+
+scipy.signal is imported on first use rather than here: it takes longer
+to import than the rest of the server together, and nothing needs it
+until the first filter is designed or applied.
+"""
+
+import threading
+from fractions import Fraction
+
+import numpy as np
+
+# ==================== FILTER REGISTRY ====================
+# Designs are keyed by (type, order, cutoffs, fs, q) and computed once
+FILTER_REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+def _design(kind, order, cutoffs, fs, q):
+    """Design one filter in second-order-sections form"""
+    from scipy.signal import butter, iirnotch, tf2sos
+    nyq = 0.5 * fs
+    if kind == "bandpass":
+        low, high = cutoffs
+        return butter(order, [low / nyq, high / nyq], btype="band", output="sos")
+    if kind == "lowpass":
+        return butter(order, cutoffs[0] / nyq, btype="low", output="sos")
+    if kind == "highpass":
+        return butter(order, cutoffs[0] / nyq, btype="high", output="sos")
+    if kind == "notch":
+        b, a = iirnotch(cutoffs[0] / nyq, q)
+        return tf2sos(b, a)
+    raise ValueError(f"Unknown filter type: {kind}")
+
+
+def design_filter(kind, order, cutoffs, fs, q=None):
+    """Return the cached SOS array for a filter, designing it on first use"""
+    key = (kind, order, tuple(float(c) for c in cutoffs), float(fs), q)
+    sos = FILTER_REGISTRY.get(key)
+    if sos is None:
+        with _registry_lock:
+            sos = FILTER_REGISTRY.get(key)
+            if sos is None:
+                sos = _design(kind, order, cutoffs, fs, q)
+                FILTER_REGISTRY[key] = sos
+    return sos
+
+
+def design_eeg_cascade(fs, lowcut, highcut, notch, q, order=4):
+    """Return the cached fused bandpass + notch SOS cascade"""
+    key = ("cascade", order, (float(lowcut), float(highcut), float(notch)), float(fs), q)
+    sos = FILTER_REGISTRY.get(key)
+    if sos is None:
+        sos = np.vstack([
+            design_filter("bandpass", order, (lowcut, highcut), fs),
+            design_filter("notch", 2, (notch,), fs, q),
+        ])
+        with _registry_lock:
+            sos = FILTER_REGISTRY.setdefault(key, sos)
+    return sos
+
+
+# ==================== FILTER OBJECTS ====================
+class SOSFilter:
+    """Reusable filter around a (cached) SOS design.
+
+    ``apply()`` is zero-phase (forward-backward) for offline arrays.
+    ``step()`` is causal and keeps its state between calls, so consecutive
+    chunks of a stream are filtered as if they were one array. Each object
+    has its own state; create one per stream.
+
+    Causal filtering trades phase accuracy for cost: every sample is filtered
+    once, but the output lags the input by the filter's group delay (see
+    ``group_delay_ms``). For the default 0.5-40 Hz + 50 Hz cascade at 250 Hz
+    that is about 12 ms in the alpha band and 13 ms in the beta band. Band
+    powers see |H| instead of the |H|^2 of ``apply()``, which is ~1 inside
+    the passband.
+    """
+
+    def __init__(self, sos):
+        self.sos = sos
+        self.zi = None
+
+    def apply(self, data):
+        """Zero-phase filter a whole array"""
+        from scipy.signal import sosfiltfilt
+        return sosfiltfilt(self.sos, data)
+
+    def step(self, chunk):
+        """Causally filter the next chunk of a stream"""
+        from scipy.signal import sosfilt, sosfilt_zi
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return chunk
+        if self.zi is None:
+            # Start in steady state for the first sample to avoid a step transient
+            self.zi = sosfilt_zi(self.sos) * chunk[0]
+        out, self.zi = sosfilt(self.sos, chunk, zi=self.zi)
+        return out
+
+    def reset(self):
+        """Forget the streaming state"""
+        self.zi = None
+
+
+def get_filter(kind, order, cutoffs, fs, q=None):
+    """Get a filter object for a single registered design"""
+    return SOSFilter(design_filter(kind, order, cutoffs, fs, q))
+
+
+def eeg_filter(fs, lowcut, highcut, notch, q, order=4):
+    """Get a filter object for the fused bandpass + notch cascade"""
+    return SOSFilter(design_eeg_cascade(fs, lowcut, highcut, notch, q, order))
+
+
+def group_delay_ms(sos, fs, band, num=64):
+    """Mean group delay (ms) of the causal filter over a frequency band"""
+    from scipy.signal import group_delay
+    freqs = np.linspace(band[0], band[1], num)
+    delay = np.zeros(num)
+    for section in sos:
+        _, gd = group_delay((section[:3], section[3:]), w=freqs, fs=fs)
+        delay += gd
+    return float(np.mean(delay) / fs * 1000)
+
+
+# ==================== DECIMATION ====================
+def decimated_rate(fs, highest_freq, window_sec, step_sec, margin=0.8):
+    """Lowest integer rate that still covers `highest_freq` after filtering.
+
+    The new Nyquist frequency keeps `highest_freq` inside the first
+    `margin` of the band (room for the anti-aliasing transition), and the
+    rate must give whole-sample windows and hops. Returns ``(rate, up,
+    down)`` for polyphase resampling; ``(fs, 1, 1)`` when nothing smaller
+    qualifies.
+    """
+    lowest = int(np.ceil(2 * highest_freq / margin))
+    for rate in range(lowest, int(fs)):
+        if float(rate * window_sec).is_integer() and float(rate * step_sec).is_integer():
+            ratio = Fraction(rate, int(fs))
+            return rate, ratio.numerator, ratio.denominator
+    return fs, 1, 1
+
+
+class Decimator:
+    """Polyphase resampler by up/down, offline or streaming.
+
+    ``apply()`` is ``scipy.signal.resample_poly`` (delay-compensated, for
+    whole arrays). ``step()`` runs the same FIR causally on a stream and
+    keeps its history between chunks, so concatenated outputs equal
+    ``upfirdn(h, x, up, down)``; the price is a delay of
+    ``delay_samples`` input samples (25 samples = 100 ms for 250 -> 100 Hz).
+    """
+
+    def __init__(self, up, down):
+        self.up = int(up)
+        self.down = int(down)
+        # Same anti-aliasing FIR resample_poly designs by default
+        max_rate = max(self.up, self.down)
+        if self.up == self.down:
+            half_len = 0
+            self.h = np.ones(1)
+        else:
+            from scipy.signal import firwin
+            half_len = 10 * max_rate
+            self.h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self.delay_samples = half_len / self.up
+
+        # One polyphase branch per phase, padded to a common length and
+        # reversed so each output is a dot product with the newest inputs
+        self.taps = -(-len(self.h) // self.up)
+        branches = np.zeros((self.up, self.taps))
+        for phase in range(self.up):
+            branch = self.h[phase::self.up]
+            branches[phase, :len(branch)] = branch
+        self.branches = branches[:, ::-1]
+        self.reset()
+
+    def apply(self, data):
+        """Resample a whole array (zero-delay, offline)"""
+        if self.up == self.down:
+            return np.asarray(data, dtype=np.float64)
+        from scipy.signal import resample_poly
+        return resample_poly(data, self.up, self.down)
+
+    def step(self, chunk):
+        """Causally resample the next chunk of a stream"""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.up == self.down or len(chunk) == 0:
+            return chunk
+        full = np.concatenate([self.history, chunk])
+        base = self.count - len(self.history)  # absolute index of full[0]
+        self.count += len(chunk)
+
+        # Outputs m whose newest input floor(m * down / up) has arrived
+        stop = -(-self.count * self.up // self.down)
+        m = np.arange(self.next_out, stop)
+        self.next_out = stop
+        newest = m * self.down // self.up - base
+        phases = (m * self.down) % self.up
+        windows = np.lib.stride_tricks.sliding_window_view(full, self.taps)
+        out = np.einsum("ij,ij->i", windows[newest - self.taps + 1], self.branches[phases])
+
+        self.history = full[-(self.taps - 1):]
+        return out
+
+    def reset(self):
+        """Forget the streaming state"""
+        self.history = np.zeros(self.taps - 1)
+        self.count = 0
+        self.next_out = 0
+
+
+# ==================== BLOCKWISE ZERO-PHASE STREAMING ====================
+class OverlapStream:
+    """Run a whole-array (zero-phase) transform over a stream, block by block.
+
+    ``process(segment)`` is any offline transform, e.g. ``filtfilt`` and
+    then ``resample_poly`` by ``up/down``. Each ``block`` of input samples
+    is processed together with ``margin`` samples of context on both sides
+    and only its middle is kept, so the output settles ``block + margin``
+    samples behind the input. ``finish()`` processes the tail with the
+    true end of the signal, like the offline transform sees it.
+
+    The concatenated outputs have the offline length and equal
+    ``process(whole_signal)`` up to the transform's transient left after
+    ``margin`` samples (exactly at both ends). ``block`` and ``margin``
+    are rounded up to multiples of ``down`` so every segment starts on an
+    output sample. Memory is bounded by ``block + 2 * margin`` samples.
+    """
+
+    def __init__(self, process, margin, block, up=1, down=1):
+        self.process = process
+        self.up = int(up)
+        self.down = int(down)
+        self.margin = -(-int(margin) // self.down) * self.down
+        self.block = max(1, -(-int(block) // self.down)) * self.down
+        self.reset()
+
+    def reset(self):
+        """Start a new stream"""
+        self.raw = np.empty(0)
+        self.raw_start = 0  # input index of raw[0]
+        self.done = 0  # input index of the first sample not yet output
+        self.total = 0  # input samples pushed
+
+    def _out(self, start, stop=None):
+        """Process raw[start - margin:stop + margin], keep the part for [start, stop)"""
+        seg_start = max(0, start - self.margin)
+        seg_stop = None if stop is None else stop + self.margin
+        seg = self.raw[seg_start - self.raw_start:None if seg_stop is None else seg_stop - self.raw_start]
+        out = self.process(seg)
+        first = (start - seg_start) * self.up // self.down
+        if stop is None:
+            return out[first:]
+        return out[first:first + (stop - start) * self.up // self.down]
+
+    def push(self, chunk):
+        """Add input samples; returns the output samples that became final"""
+        self.raw = np.concatenate([self.raw, np.asarray(chunk, dtype=np.float64)])
+        self.total += len(chunk)
+        outputs = []
+        while self.total >= self.done + self.block + self.margin:
+            outputs.append(self._out(self.done, self.done + self.block))
+            self.done += self.block
+            # Keep only the left context of the next block
+            keep = max(0, self.done - self.margin)
+            self.raw = self.raw[keep - self.raw_start:]
+            self.raw_start = keep
+        return np.concatenate(outputs) if outputs else np.empty(0)
+
+    def finish(self):
+        """Output the rest, processed up to the real end of the stream"""
+        if self.done >= self.total:
+            return np.empty(0)
+        out = self._out(self.done)
+        self.done = self.total
+        return out
+
+
+# ==================== SPECTRAL ESTIMATION ====================
+class IncrementalWelch:
+    """Welch PSD for sliding windows that reuses overlapping segment FFTs.
+
+    Matches ``scipy.signal.welch(window, fs, nperseg=nperseg,
+    noverlap=noverlap)`` (Hann window, constant detrend, density scaling,
+    mean averaging) to within floating-point rounding (relative error
+    below 1e-12).
+
+    Each segment's periodogram is cached under its absolute sample offset,
+    so a window only transforms segments that no earlier window covered.
+    Reuse needs two things: the samples at a given offset must not change
+    between windows (a whole-file filtered signal, or the causal live
+    ring, but not per-window zero-phase filtering), and the segment stride
+    ``nperseg - noverlap`` must divide the hop. Given a `hop` the stride
+    does not divide (the default ``nperseg=256`` with a 125-sample hop),
+    nothing is cached and each window's segments go through one batched
+    rFFT instead. Use e.g. ``nperseg=250, noverlap=125`` to transform one
+    new segment per hop.
+    """
+
+    def __init__(self, fs, nperseg, window_size, noverlap=None, hop=None):
+        # Same clamping as welch() for windows shorter than nperseg
+        self.nperseg = min(int(nperseg), int(window_size))
+        self.noverlap = self.nperseg // 2 if noverlap is None else int(noverlap)
+        if not 0 <= self.noverlap < self.nperseg:
+            raise ValueError("noverlap must be smaller than nperseg")
+        self.fs = fs
+        self.window_size = int(window_size)
+        self.stride = self.nperseg - self.noverlap
+        self.n_segments = (self.window_size - self.noverlap) // self.stride
+        self.reuse = hop is None or int(hop) % self.stride == 0
+
+        from scipy.signal import get_window
+        self.taper = get_window("hann", self.nperseg)
+        self.scale = 1.0 / (fs * (self.taper * self.taper).sum())
+        self.freqs = np.fft.rfftfreq(self.nperseg, 1.0 / fs)
+
+        self.cache = {}  # absolute segment offset -> one-sided periodogram
+        self.computed = 0
+        self.reused = 0
+
+    def _periodogram(self, segment):
+        """One-sided periodogram of a segment, or of each row of a 2-D array"""
+        seg = (segment - segment.mean(axis=-1, keepdims=True)) * self.taper
+        spec = np.fft.rfft(seg, axis=-1)
+        pxx = (spec.real * spec.real + spec.imag * spec.imag) * self.scale
+        if self.nperseg % 2:
+            pxx[..., 1:] *= 2
+        else:
+            pxx[..., 1:-1] *= 2
+        return pxx
+
+    def psd(self, window, start):
+        """PSD of `window`, whose first sample has absolute index `start`"""
+        if len(window) != self.window_size:
+            raise ValueError(f"expected a window of {self.window_size} samples")
+        if not self.reuse:
+            # All segments in one rFFT, as batch_welch() does per row
+            self.computed += self.n_segments
+            window = np.asarray(window, dtype=np.float64)
+            return self.freqs, self._periodogram(np.lib.stride_tricks.as_strided(
+                window, shape=(self.n_segments, self.nperseg),
+                strides=(self.stride * window.strides[0], window.strides[0]), writeable=False,
+            )).mean(axis=0)
+        total = np.zeros(len(self.freqs))
+        for k in range(self.n_segments):
+            rel = k * self.stride
+            offset = start + rel
+            pxx = self.cache.get(offset)
+            if pxx is None:
+                pxx = self._periodogram(window[rel:rel + self.nperseg])
+                self.cache[offset] = pxx
+                self.computed += 1
+            else:
+                self.reused += 1
+            total += pxx
+
+        # Segments before this window can never be used again
+        for offset in [o for o in self.cache if o < start]:
+            del self.cache[offset]
+
+        return self.freqs, total / self.n_segments
+
+    def reset(self):
+        """Drop cached periodograms (e.g. when the stream restarts)"""
+        self.cache.clear()
+
+
+# ==================== BATCH FEATURE EXTRACTION ====================
+def sliding_windows(signal, window_size, step_size):
+    """Strided (n_windows, window_size) view of `signal`, no copies.
+
+    Window starts follow ``range(0, len(signal) - window_size, step_size)``,
+    the schedule used by the offline extractors.
+    """
+    signal = np.ascontiguousarray(signal, dtype=np.float64)
+    n_windows = len(range(0, len(signal) - window_size, step_size))
+    if n_windows == 0:
+        return np.empty((0, window_size))
+    stride = signal.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        signal, shape=(n_windows, window_size),
+        strides=(step_size * stride, stride), writeable=False,
+    )
+
+
+class WindowStream:
+    """Sliding windows of a stream, on the same schedule as ``sliding_windows()``.
+
+    ``push()`` returns, as an (n, window_size) array, every window that is
+    complete and followed by at least one more sample (the offline
+    schedule never includes a window that ends exactly at the end of the
+    signal). Only the samples of windows still to come are kept.
+    """
+
+    def __init__(self, window_size, step_size):
+        self.window_size = int(window_size)
+        self.step_size = int(step_size)
+        self.reset()
+
+    def reset(self):
+        """Start a new stream"""
+        self.tail = np.empty(0)  # samples from the next window start on
+        self.count = 0  # windows returned so far
+
+    def push(self, samples):
+        """Add samples; returns the windows that became available"""
+        self.tail = np.concatenate([self.tail, np.asarray(samples, dtype=np.float64)])
+        windows = sliding_windows(self.tail, self.window_size, self.step_size).copy()
+        self.count += len(windows)
+        self.tail = self.tail[len(windows) * self.step_size:]
+        return windows
+
+
+def band_weights(freqs, bands):
+    """(n_freqs, n_bands) matrix so that ``psd @ W`` equals the trapezoid
+    band power ``np.trapz(psd[idx], freqs[idx])`` for each band"""
+    weights = np.zeros((len(freqs), len(bands)))
+    for col, (low, high) in enumerate(bands):
+        idx = np.flatnonzero((freqs >= low) & (freqs <= high))
+        half = np.diff(freqs[idx]) / 2
+        weights[idx[:-1], col] += half
+        weights[idx[1:], col] += half
+    return weights
+
+
+def batch_welch(windows, fs, nperseg, noverlap=None, batch=4096):
+    """Welch PSD of every row of `windows` with one batched rFFT per batch.
+
+    Same estimate as calling ``welch(row, fs, nperseg=nperseg,
+    noverlap=noverlap)`` on each row. Rows are processed `batch` at a time
+    to bound memory on long recordings.
+    """
+    window_size = windows.shape[1]
+    nperseg = min(int(nperseg), window_size)
+    noverlap = nperseg // 2 if noverlap is None else int(noverlap)
+    seg_stride = nperseg - noverlap
+    n_segments = (window_size - noverlap) // seg_stride
+
+    from scipy.signal import get_window
+    taper = get_window("hann", nperseg)
+    scale = 1.0 / (fs * (taper * taper).sum())
+    freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+    psd = np.empty((len(windows), len(freqs)))
+
+    row_stride, col_stride = windows.strides
+    for lo in range(0, len(windows), batch):
+        rows = windows[lo:lo + batch]
+        # (rows, segments, nperseg) view of every segment of every window
+        segments = np.lib.stride_tricks.as_strided(
+            rows, shape=(len(rows), n_segments, nperseg),
+            strides=(row_stride, seg_stride * col_stride, col_stride), writeable=False,
+        )
+        segs = (segments - segments.mean(axis=-1, keepdims=True)) * taper
+        spec = np.fft.rfft(segs, axis=-1)
+        pxx = (spec.real * spec.real + spec.imag * spec.imag) * scale
+        if nperseg % 2:
+            pxx[..., 1:] *= 2
+        else:
+            pxx[..., 1:-1] *= 2
+        psd[lo:lo + batch] = pxx.mean(axis=1)
+
+    return freqs, psd
+
+
+def batch_band_powers(signal, fs, window_size, step_size, bands, nperseg, noverlap=None):
+    """Band powers of every sliding window: (n_windows, n_bands)"""
+    windows = sliding_windows(signal, window_size, step_size)
+    freqs, psd = batch_welch(windows, fs, nperseg, noverlap)
+    return psd @ band_weights(freqs, bands)
+
+
+# ==================== SPECTRAL FEATURE BANK ====================
+EEG_BANDS = {
+    "delta": (0.5, 4),
+    "theta": (4, 8),
+    "alpha": (8, 13),
+    "beta": (13, 30),
+    "gamma": (30, 40),
+}
+
+
+class FeatureBank:
+    """All spectral features of a window derived from one PSD.
+
+    For every band: absolute power (``Alpha``) and power relative to the
+    whole band range (``RelAlpha``). Plus ``AlphaBetaRatio`` (when both
+    bands exist), ``TotalPower``, ``PeakFrequency``, ``SpectralCentroid``
+    and ``SpectralSlope`` (log-log least-squares fit), all restricted to
+    the band range, with DC excluded from the slope fit.
+
+    Band powers use precomputed trapezoid weights (identical to
+    ``band_power``), and the slope fit uses a cached pseudo-inverse of the
+    log-frequency design, so ``compute()`` is a few matrix products and
+    works on one PSD or on a (windows x freqs) batch.
+    """
+
+    def __init__(self, freqs, bands=None):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.bands = dict(EEG_BANDS if bands is None else bands)
+
+        low = min(lo for lo, _ in self.bands.values())
+        high = max(hi for _, hi in self.bands.values())
+        self.range_mask = (self.freqs >= low) & (self.freqs <= high)
+        self.range_freqs = self.freqs[self.range_mask]
+
+        # Columns: each band, then the whole range for relative powers
+        self.weights = band_weights(self.freqs, list(self.bands.values()) + [(low, high)])
+
+        fit = self.range_mask & (self.freqs > 0)
+        self.fit_mask = fit
+        design = np.column_stack([np.log(self.freqs[fit]), np.ones(fit.sum())])
+        self.slope_row = np.linalg.pinv(design)[0]
+
+        band_names = [name.capitalize() for name in self.bands]
+        self.names = band_names + [f"Rel{name}" for name in band_names]
+        self.has_ratio = "alpha" in self.bands and "beta" in self.bands
+        if self.has_ratio:
+            self.names.append("AlphaBetaRatio")
+        self.names += ["TotalPower", "PeakFrequency", "SpectralCentroid", "SpectralSlope"]
+
+    @classmethod
+    def for_welch(cls, fs, nperseg, window_size, bands=None):
+        """Bank for the frequency grid welch() produces for these settings"""
+        nperseg = min(int(nperseg), int(window_size))
+        return cls(np.fft.rfftfreq(nperseg, 1.0 / fs), bands)
+
+    def index(self, names):
+        """Column indices of the given feature names"""
+        return [self.names.index(name) for name in names]
+
+    def compute(self, psd):
+        """Feature matrix (windows x len(names)), or a vector for one PSD"""
+        psd = np.asarray(psd, dtype=np.float64)
+        single = psd.ndim == 1
+        psd = np.atleast_2d(psd)
+
+        powers = psd @ self.weights
+        bands, total = powers[:, :-1], powers[:, -1:]
+        in_range = psd[:, self.range_mask]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns = [bands, bands / total]
+            if self.has_ratio:
+                names = list(self.bands)
+                alpha = bands[:, names.index("alpha")]
+                beta = bands[:, names.index("beta")]
+                columns.append((alpha / beta)[:, None])
+            peak = self.range_freqs[np.argmax(in_range, axis=1)]
+            centroid = (in_range @ self.range_freqs) / in_range.sum(axis=1)
+            log_psd = np.log(np.maximum(psd[:, self.fit_mask], np.finfo(float).tiny))
+            slope = log_psd @ self.slope_row
+
+        columns += [total, peak[:, None], centroid[:, None], slope[:, None]]
+        features = np.hstack(columns)
+        return features[0] if single else features
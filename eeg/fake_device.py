@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+EEG Calmness Monitor - Stand-in Serial Device
+Streams synthetic EEG over a pseudo-terminal so the app and the recorder
+scripts can be run without an Arduino (Linux/macOS only).
+
+    python fake_device.py                 # binary frames at 250 Hz
+    python fake_device.py --format ascii  # legacy one-value-per-line
+
+Connect the app (or a script's PORT) to the device path it prints.
+"""
+
+import argparse
+import os
+import time
+import tty
+
+import numpy as np
+
+from acquisition import SAMPLES_PER_FRAME, encode_frames
+
+
+def synthetic_eeg(start, count, fs, rng):
+    """ADC samples: mid-scale offset + alpha/beta rhythms + noise + 50 Hz hum"""
+    t = (start + np.arange(count)) / fs
+    # Alpha waxes and wanes every 20 s so calm/not calm both show up
+    alpha_gain = 0.5 + 0.5 * np.sin(2 * np.pi * t / 20)
+    signal = (
+        2048
+        + 200 * alpha_gain * np.sin(2 * np.pi * 10 * t)
+        + 80 * np.sin(2 * np.pi * 20 * t)
+        + 30 * np.sin(2 * np.pi * 50 * t)
+        + rng.normal(0, 40, count)
+    )
+    return np.clip(np.round(signal), 0, 4095).astype(np.uint16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic EEG serial device on a pty")
+    parser.add_argument("--format", choices=["binary", "ascii"], default="binary")
+    parser.add_argument("--rate", type=int, default=250, help="samples per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    print(f"Stand-in EEG device ({args.format}, {args.rate} Hz) on: {os.ttyname(slave)}")
+    print("Press CTRL+C to stop")
+
+    rng = np.random.default_rng(args.seed)
+    block = SAMPLES_PER_FRAME  # one frame (or 8 lines) per write
+    seq = 0
+    sent = 0
+    start = time.monotonic()
+    try:
+        while True:
+            samples = synthetic_eeg(sent, block, args.rate, rng)
+            if args.format == "binary":
+                data, seq = encode_frames(samples, seq)
+            else:
+                data = b"".join(b"%d\r\n" % value for value in samples)
+            try:
+                os.write(master, data)
+            except BlockingIOError:
+                pass  # nobody reading and the pty buffer is full
+            sent += block
+
+            # Pace against the wall clock so the rate does not drift
+            delay = start + sent / args.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        print(f"\nStopped after {sent} samples")
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    main()
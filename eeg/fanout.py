@@ -0,0 +1,137 @@
+"""
+EEG Calmness Monitor - Socket.IO Fan-out
+Serializes each message once and thins the waveform for slow clients
+instead of letting them back up the server
+"""
+
+from importlib.metadata import PackageNotFoundError, version
+
+from engineio import packet as eio_packet
+from socketio import packet as sio_packet
+
+# Sending pre-encoded packets and reading send queues uses internals of
+# python-socketio (Server._send_eio_packet) and python-engineio (each
+# socket's .queue). Both are stable within these major versions, the ones
+# this was written against; anything else falls back to a plain emit()
+SUPPORTED_MAJOR = {"python-socketio": 5, "python-engineio": 4}
+
+
+def internals_supported(server):
+    """Whether `server` has the internals Fanout relies on"""
+    try:
+        for package, major in SUPPORTED_MAJOR.items():
+            if int(version(package).split(".")[0]) != major:
+                return False
+    except (PackageNotFoundError, ValueError):
+        return False
+    return hasattr(server, "_send_eio_packet") and hasattr(getattr(server, "eio", None), "sockets")
+
+
+class ClientRate:
+    """Frame thinning state of one client"""
+
+    def __init__(self):
+        self.stride = 1  # send every stride-th droppable message
+        self.phase = 0
+        self.sent = 0
+        self.skipped = 0
+
+
+class Fanout:
+    """Send each message to its recipients without letting a slow client hold anyone up.
+
+    A message is encoded into Engine.IO packets once and the same packets
+    are queued for every recipient. Each client's Engine.IO send queue is
+    its bounded queue: ``droppable`` events (waveform frames) are thinned
+    for a client whose queue is not draining (every 2nd, 4th, ... frame, up
+    to ``max_stride``) and skipped outright once ``max_pending`` packets
+    are waiting; the stride halves again each time the queue is found
+    empty. Other events (predictions) are always queued.
+
+    On a python-socketio/engineio without the internals this needs
+    (``internals_supported()``), every event goes out through the
+    server's own ``emit()`` instead: correct, but encoded per call and
+    not thinned.
+    """
+
+    def __init__(self, server, droppable=('waveform_frame',), max_pending=16, max_stride=16,
+                 namespace='/'):
+        self.server = server  # python-socketio Server
+        self.droppable = set(droppable)
+        self.max_pending = max_pending
+        self.max_stride = max_stride
+        self.namespace = namespace
+        self.clients = {}  # sid -> ClientRate
+        self.messages = 0
+        self.encodes = 0
+        self.fast = internals_supported(server)
+        if not self.fast:
+            print("[Fanout] Unsupported python-socketio/engineio version; "
+                  "sending with emit(), without per-client thinning")
+
+    def encode(self, event, data):
+        """Engine.IO packets of one Socket.IO event (text + binary attachments)"""
+        self.encodes += 1
+        pkt = self.server.packet_class(sio_packet.EVENT, namespace=self.namespace, data=[event, data])
+        encoded = pkt.encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        return [eio_packet.Packet(eio_packet.MESSAGE, part) for part in encoded]
+
+    def backlog(self, eio_sid):
+        """Packets waiting in a client's Engine.IO send queue"""
+        socket = self.server.eio.sockets.get(eio_sid)
+        queue = getattr(socket, "queue", None)
+        return queue.qsize() if queue is not None else 0
+
+    def admit(self, sid, eio_sid):
+        """Whether a client gets this droppable message, adapting its stride"""
+        rate = self.clients.setdefault(sid, ClientRate())
+        backlog = self.backlog(eio_sid)
+        if backlog >= self.max_pending:
+            rate.stride = min(rate.stride * 2, self.max_stride)
+            rate.skipped += 1
+            return False
+        if backlog == 0 and rate.stride > 1:
+            rate.stride //= 2
+
+        rate.phase += 1
+        if rate.phase % rate.stride:
+            rate.skipped += 1
+            return False
+        rate.sent += 1
+        return True
+
+    def send(self, event, data, to=None):
+        """Queue an event for one client, a room, or everyone (`to` None)"""
+        self.messages += 1
+        if not self.fast:
+            self.server.emit(event, data, to=to, namespace=self.namespace)
+            return
+        droppable = event in self.droppable
+        packets = None
+        for sid, eio_sid in self.server.manager.get_participants(self.namespace, to):
+            if droppable and not self.admit(sid, eio_sid):
+                continue
+            if packets is None:
+                packets = self.encode(event, data)  # once, on the first recipient
+            for pkt in packets:
+                self.server._send_eio_packet(eio_sid, pkt)
+
+    def drop(self, sid):
+        """Forget a disconnected client"""
+        self.clients.pop(sid, None)
+
+    def stats(self):
+        """Message/encode counts and how many clients are being thinned"""
+        clients = dict(self.clients)
+        return {
+            'fast_path': self.fast,
+            'clients': len(clients),
+            'messages': self.messages,
+            'encodes': self.encodes,
+            'thinned_clients': sum(rate.stride > 1 for rate in clients.values()),
+            'frames_sent': sum(rate.sent for rate in clients.values()),
+            'frames_skipped': sum(rate.skipped for rate in clients.values()),
+            'max_stride': max((rate.stride for rate in clients.values()), default=1),
+        }
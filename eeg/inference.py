@@ -0,0 +1,90 @@
+"""
+EEG Calmness Monitor - Linear Inference
+Logistic regression with the StandardScaler folded into its weights, scored
+with one dot product in NumPy (serving needs no sklearn)
+"""
+
+import math
+
+import numpy as np
+
+
+class LinearScorer:
+    """Compiled ``scaler`` + ``LogisticRegression`` pair.
+
+    Scaling is linear, so ``coef . (x - mean) / scale + intercept`` is
+    ``(coef / scale) . x + (intercept - coef . mean / scale)``: the folded
+    ``weights`` and ``bias`` score raw feature rows directly. Labels and
+    probabilities match ``model.predict`` / ``model.predict_proba`` after
+    ``scaler.transform`` (binary: logistic; more classes: softmax, as
+    sklearn's default multinomial model).
+
+    ``score(features)`` takes any number of rows (windows, streams) in one
+    call; ``predict_one(row)`` is the per-hop path in plain Python floats,
+    which for a handful of features beats NumPy's per-call overhead.
+    ``save()`` / ``load()`` use an ``.npz`` file without pickles.
+    """
+
+    def __init__(self, classes, weights, bias):
+        self.classes = np.asarray(classes)
+        self.weights = np.asarray(weights, dtype=float)  # features x (1 if binary else classes)
+        self.bias = np.asarray(bias, dtype=float)
+        self.n_features, n_outputs = self.weights.shape
+        self.binary = n_outputs == 1
+        self._labels = self.classes.tolist()
+        self._rows = [(column.tolist(), float(b)) for column, b in zip(self.weights.T, self.bias)]
+
+    @classmethod
+    def fold(cls, model, scaler=None):
+        """Compile a fitted LogisticRegression (and the scaler it was trained behind)"""
+        coef = np.asarray(model.coef_, dtype=float)
+        intercept = np.asarray(model.intercept_, dtype=float)
+        if scaler is not None:
+            if getattr(scaler, "scale_", None) is not None:
+                coef = coef / scaler.scale_
+            if getattr(scaler, "mean_", None) is not None:
+                intercept = intercept - coef @ scaler.mean_
+        return cls(model.classes_, coef.T, intercept)
+
+    # -------- SCORING --------
+    def score(self, features):
+        """Labels and predicted-class probabilities for rows of features"""
+        z = np.atleast_2d(np.asarray(features, dtype=float)) @ self.weights + self.bias
+        if self.binary:
+            z = z[:, 0]
+            index = (z > 0).astype(int)
+            # Probability of the predicted class: sigmoid(|z|)
+            probability = 1.0 / (1.0 + np.exp(-np.abs(z)))
+        else:
+            z = np.exp(z - z.max(axis=1, keepdims=True))
+            index = z.argmax(axis=1)
+            probability = z[np.arange(len(z)), index] / z.sum(axis=1)
+        return self.classes[index], probability
+
+    def predict_one(self, row):
+        """(label, probability) for one feature row"""
+        values = row.tolist() if hasattr(row, "tolist") else list(row)
+        if len(values) != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {len(values)}")
+        if self.binary:
+            weights, z = self._rows[0]
+            for w, x in zip(weights, values):
+                z += w * x
+            return self._labels[z > 0], 1.0 / (1.0 + math.exp(-abs(z)))
+        scores = []
+        for weights, z in self._rows:
+            for w, x in zip(weights, values):
+                z += w * x
+            scores.append(z)
+        top = max(scores)
+        index = scores.index(top)
+        return self._labels[index], 1.0 / sum(math.exp(s - top) for s in scores)
+
+    # -------- FILES --------
+    def save(self, path):
+        np.savez(path, classes=self.classes.astype(str), weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["classes"], data["weights"], data["bias"])
@@ -0,0 +1,143 @@
+"""
+EEG Calmness Monitor - Serial Ingest
+Event-driven reader: sleeps in the serial driver until a chunk of samples
+has arrived, decodes it in one go and hands it downstream
+"""
+
+import threading
+import time
+
+from acquisition import FRAME_SIZE, SAMPLES_PER_FRAME
+
+# Approximate bytes on the wire per sample, used to size blocking reads
+BYTES_PER_SAMPLE = {
+    "binary": FRAME_SIZE / SAMPLES_PER_FRAME,  # 2.25
+    "ascii": 6,                                # "2048\r\n"
+}
+
+
+def block_bytes(fs, chunk_sec, fmt=None):
+    """Bytes that carry about `chunk_sec` of samples in format `fmt`.
+
+    An unknown format (auto-detect still pending) assumes the densest one,
+    so a read never waits much longer than `chunk_sec`.
+    """
+    per_sample = BYTES_PER_SAMPLE.get(fmt, min(BYTES_PER_SAMPLE.values()))
+    return max(1, int(fs * chunk_sec * per_sample))
+
+
+def read_block(ser, parser, fs, chunk_sec=0.02):
+    """Block until ~`chunk_sec` of data (or the port timeout), decode it.
+
+    Whatever else is already buffered is taken in the same call, so a
+    reader that fell behind catches up in one wakeup.
+    """
+    data = ser.read(block_bytes(fs, chunk_sec, parser.format))
+    waiting = ser.in_waiting
+    if waiting:
+        data += ser.read(waiting)
+    return parser.feed(data)
+
+
+def timed_read_block(ser, parser, fs, chunk_sec):
+    """read_block() and the CPU seconds it took on the calling OS thread"""
+    started = time.thread_time()
+    adc = read_block(ser, parser, fs, chunk_sec)
+    return adc, time.thread_time() - started
+
+
+class SerialIngest:
+    """Blocking serial reader for one port at a time, run on its own thread.
+
+    ``run(on_samples)`` loops forever: while no port is attached it parks on
+    an event (no wakeups at all); once ``attach()`` hands it a port it
+    blocks in ``read_block()`` and calls ``on_samples(adc)`` once per chunk.
+    Wakeups are bounded by ``1 / chunk_sec`` whatever the sample rate.
+    With ``green=True`` (eventlet servers, where this loop is a green
+    thread) each blocking read runs in ``eventlet.tpool``, on a real OS
+    thread: the hub and the other stages keep running while the reader
+    waits in the driver, and an idle port still costs no wakeups.
+
+    ``counters()`` snapshots cumulative wakeups/samples and CPU time, and
+    ``rates(before, after)`` turns two snapshots into per-second figures.
+    Reader CPU is the time spent in reads and decoding, measured on the
+    OS thread that did them, so it is the reader's own share even when
+    other green threads share its thread.
+    """
+
+    def __init__(self, fs, chunk_sec=0.02, green=False):
+        self.fs = fs
+        self.chunk_sec = chunk_sec
+        if green:
+            from eventlet import tpool
+            self.call = tpool.execute
+        else:
+            self.call = lambda function, *args: function(*args)
+        self.port = None
+        self.parser = None
+        self.attached = threading.Event()
+        self.wakeups = 0
+        self.chunks = 0
+        self.samples = 0
+        self.reader_cpu = 0.0  # CPU seconds spent reading and decoding
+
+    def attach(self, port, parser):
+        """Start reading `port`, decoding with `parser`"""
+        self.parser = parser
+        self.port = port
+        self.attached.set()
+
+    def detach(self):
+        """Stop reading; the thread parks until the next attach()"""
+        self.attached.clear()
+        self.port = None
+
+    def run(self, on_samples):
+        """Reader loop, call on a dedicated (daemon) thread"""
+        while True:
+            self.attached.wait()
+            port, parser = self.port, self.parser
+            if port is None:
+                continue
+            try:
+                adc, cpu = self.call(timed_read_block, port, parser, self.fs, self.chunk_sec)
+            except Exception as e:
+                # Closing the port from another thread interrupts the read
+                if self.port is port and port.is_open:
+                    print(f"Serial read error: {e}")
+                    time.sleep(0.1)
+                continue
+            finally:
+                self.wakeups += 1
+            self.reader_cpu += cpu
+
+            if len(adc):
+                self.chunks += 1
+                self.samples += len(adc)
+                on_samples(adc)
+
+    def counters(self):
+        """Cumulative counters, for rates()"""
+        return {
+            'time': time.monotonic(),
+            'process_cpu': time.process_time(),
+            'reader_cpu': self.reader_cpu,
+            'wakeups': self.wakeups,
+            'chunks': self.chunks,
+            'samples': self.samples,
+        }
+
+    @staticmethod
+    def rates(before, after):
+        """Per-second rates and CPU use between two counters() snapshots"""
+        elapsed = max(after['time'] - before['time'], 1e-9)
+        reader_cpu = (after['reader_cpu'] - before['reader_cpu']) / elapsed
+        chunks = after['chunks'] - before['chunks']
+        return {
+            'wakeups_per_sec': (after['wakeups'] - before['wakeups']) / elapsed,
+            'samples_per_sec': (after['samples'] - before['samples']) / elapsed,
+            'samples_per_chunk': (after['samples'] - before['samples']) / chunks if chunks else 0.0,
+            'reader_cpu_percent': 100 * reader_cpu,
+            'reader_idle_percent': 100 * (1 - reader_cpu),
+            'process_cpu_percent': 100 * (after['process_cpu'] - before['process_cpu']) / elapsed,
+        }
@@ -0,0 +1,220 @@
+"""
+EEG Calmness Monitor - Background Jobs
+Process pool for CPU-heavy work (training, reprocessing) with job IDs,
+progress reporting and cancellation, off the request and live threads
+"""
+
+import itertools
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from contextlib import contextmanager
+
+MAX_ACTIVE = 64  # queued + running jobs (one cancel flag each)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by report() once the job has been cancelled"""
+
+
+# -------- WORKER SIDE --------
+_progress = None  # write end of the progress pipe
+_progress_lock = None
+_cancel_flags = None
+_current = None  # (job id, cancel slot) of the job running in this process
+
+
+def _init_worker(progress, progress_lock, cancel_flags):
+    global _progress, _progress_lock, _cancel_flags
+    _progress, _progress_lock, _cancel_flags = progress, progress_lock, cancel_flags
+
+
+def _run(job_id, slot, fn, args):
+    global _current
+    _current = (job_id, slot)
+    try:
+        report(0.0, "Started")
+        return fn(*args)
+    finally:
+        _current = None
+
+
+def report(progress, message=""):
+    """Publish a job's progress (0-1) from inside it; raises JobCancelled once cancelled.
+
+    Call it between steps: cancelling a running job takes effect at its next
+    report(). Outside a job worker (a plain function call) it does nothing.
+    """
+    if _current is None:
+        return
+    job_id, slot = _current
+    if _cancel_flags[slot]:
+        raise JobCancelled()
+    with _progress_lock:
+        _progress.send((job_id, float(progress), message))
+
+
+# -------- SERVER SIDE --------
+@contextmanager
+def _main_hidden():
+    """Start spawned workers without re-running the server's main script.
+
+    spawn runs the parent's __main__ in each new worker (as __mp_main__) so
+    that functions defined there can be unpickled. Job functions live in
+    importable modules, so the script is hidden while workers start
+    """
+    main = sys.modules['__main__']
+    saved = {key: main.__dict__[key] for key in ('__spec__', '__file__') if key in main.__dict__}
+    main.__spec__ = None
+    main.__dict__.pop('__file__', None)
+    try:
+        yield
+    finally:
+        main.__dict__.update(saved)
+
+
+class JobQueue:
+    """Run functions in worker processes and track them as jobs.
+
+    ``submit(kind, fn, *args)`` returns a job dict at once::
+
+        {'id', 'kind', 'status', 'progress', 'message', 'result', 'error',
+         'submitted', 'started', 'finished'}
+
+    with ``status`` one of queued, running, done, failed, cancelled. `fn`
+    and its arguments must be picklable: module-level functions of an
+    importable module, not of the script the server runs as __main__
+    (workers do not execute it, see _main_hidden); inside,
+    ``report(progress, message)`` updates the job. ``on_update(job)`` is
+    called with a copy of the job after every change, from the ``run()``
+    thread (progress) or the pool's thread (completion).
+
+    Workers are started with "spawn" on every platform, so they do not
+    inherit the server's threads, sockets or serial port; the pool starts
+    them on the first submit, which is also when the shared lock and cancel
+    flags are created (a spawn-context lock starts a resource tracker
+    process).
+    """
+
+    def __init__(self, workers=None, on_update=None, history=50):
+        self.workers = workers
+        self.on_update = on_update
+        self.history = history
+        self.context = multiprocessing.get_context("spawn")
+        self.reader, self.writer = self.context.Pipe(duplex=False)
+        self.writer_lock = None
+        self.cancel_flags = None
+        self.pool = None
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # id -> job dict, oldest first
+        self.futures = {}  # id -> Future of an active job
+        self.slots = {}  # id -> cancel flag slot of an active job
+        self.ids = itertools.count(1)
+
+    def _changed(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def submit(self, kind, fn, *args):
+        """Queue `fn(*args)` in a worker process; returns the new job"""
+        with self.lock:
+            free = set(range(MAX_ACTIVE)) - set(self.slots.values())
+            if not free:
+                raise RuntimeError("Too many jobs queued")
+            if self.pool is None:
+                self.writer_lock = self.context.Lock()
+                self.cancel_flags = self.context.RawArray('b', MAX_ACTIVE)
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=self.context,
+                                                initializer=_init_worker,
+                                                initargs=(self.writer, self.writer_lock, self.cancel_flags))
+            job_id = f"{kind}-{next(self.ids)}"
+            slot = min(free)
+            self.cancel_flags[slot] = 0
+            job = {'id': job_id, 'kind': kind, 'status': 'queued', 'progress': 0.0, 'message': '',
+                   'result': None, 'error': None, 'submitted': time.time(), 'started': None,
+                   'finished': None}
+            self.jobs[job_id] = job
+            self.slots[job_id] = slot
+            # Forget the oldest finished jobs
+            while len(self.jobs) > self.history:
+                old = next((i for i in self.jobs if i not in self.slots), None)
+                if old is None:
+                    break
+                del self.jobs[old]
+            with _main_hidden():  # the pool starts its workers on submit
+                future = self.pool.submit(_run, job_id, slot, fn, args)
+            self.futures[job_id] = future
+            job = dict(job)
+        self._changed(job)
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        return job
+
+    def _finished(self, job_id, future):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            self.futures.pop(job_id, None)
+            self.slots.pop(job_id, None)
+            if job is None:
+                return
+            try:
+                job['result'] = future.result()
+                job['status'] = 'done'
+                job['progress'] = 1.0
+            except (CancelledError, JobCancelled):
+                job['status'] = 'cancelled'
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = f"{type(e).__name__}: {e}"
+                traceback.print_exception(e)
+            job['finished'] = time.time()
+            job = dict(job)
+        self._changed(job)
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or ask a running one to stop; False if already over"""
+        with self.lock:
+            future = self.futures.get(job_id)
+            if future is None:
+                return False
+            self.cancel_flags[self.slots[job_id]] = 1
+        future.cancel()  # queued: never runs; running: stops at its next report()
+        return True
+
+    def get(self, job_id):
+        """Copy of one job, or None"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        """Copies of all tracked jobs, newest first"""
+        with self.lock:
+            return [dict(job) for job in reversed(self.jobs.values())]
+
+    def run(self):
+        """Progress listener, call on a dedicated (daemon) thread"""
+        while True:
+            # poll() waits in select(), which green-thread servers can yield in
+            if not self.reader.poll(1.0):
+                continue
+            job_id, progress, message = self.reader.recv()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job['status'] not in ('queued', 'running'):
+                    continue
+                if job['status'] == 'queued':
+                    job['status'] = 'running'
+                    job['started'] = time.time()
+                job['progress'] = progress
+                job['message'] = message
+                job = dict(job)
+            self._changed(job)
+
+    def shutdown(self):
+        """Stop the worker processes (cancels queued jobs)"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
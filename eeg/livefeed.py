@@ -0,0 +1,65 @@
+"""
+EEG Calmness Monitor - Live Feed
+Versioned snapshot of the latest results, published by the EEG loop and
+read by any number of HTTP threads without a shared lock
+"""
+
+import threading
+from collections import namedtuple
+
+# One published version. Never mutated after publish(); `changed` is set
+# when the next version replaces it.
+Snapshot = namedtuple("Snapshot", "seq entries state changed")
+
+
+class LiveFeed:
+    """Single-writer, many-reader feed of (seq, value) entries plus a state.
+
+    ``publish()`` builds a new immutable ``Snapshot`` (the last ``history``
+    entries as a tuple) and swaps it in with one reference assignment, so
+    readers always see a consistent version and never take a lock the
+    writer needs. Each snapshot carries an Event that fires once it has
+    been superseded; ``wait(since, timeout)`` blocks on it until there is
+    something other than version ``since``.
+
+    ``delta(snapshot, since)`` is what a client that has seen up to
+    ``since`` is missing. A client too far behind (or new, ``since`` 0)
+    gets the full history with ``reset`` True.
+    """
+
+    def __init__(self, history=50, state=None):
+        self.history = history
+        self.current = Snapshot(0, (), state, threading.Event())
+
+    def publish(self, value, state):
+        """Append one entry and set the state (EEG loop only)"""
+        old = self.current
+        seq = old.seq + 1
+        entries = (old.entries + ((seq, value),))[-self.history:]
+        self.current = Snapshot(seq, entries, state, threading.Event())
+        old.changed.set()
+
+    def wait(self, since, timeout=None):
+        """Newest snapshot once it differs from version `since` (or on timeout).
+
+        A `since` ahead of the feed (the server restarted) returns at once.
+        """
+        snapshot = self.current
+        if snapshot.seq == since:
+            snapshot.changed.wait(timeout)
+            snapshot = self.current
+        return snapshot
+
+    @staticmethod
+    def delta(snapshot, since):
+        """JSON-ready changes of `snapshot` after sequence number `since`"""
+        entries = snapshot.entries
+        first = entries[0][0] if entries else snapshot.seq + 1
+        reset = since <= 0 or since < first - 1 or since > snapshot.seq
+        new = entries if reset else entries[len(entries) - (snapshot.seq - since):]
+        return {
+            "seq": snapshot.seq,
+            "reset": reset,
+            "values": [value for _, value in new],
+            "state": snapshot.state,
+        }
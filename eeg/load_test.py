@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+EEG Calmness Monitor - Dashboard Load Test
+Opens N Socket.IO clients against a running app.py and reports the
+waveform frames/bytes each of them receives.
+
+    python app.py                      # terminal 1
+    python fake_device.py              # terminal 2, prints /dev/pts/N
+    python load_test.py --clients 200 --slow 20 --port /dev/pts/N
+
+With --port the test connects the app to that serial port and records a
+throwaway "load_test" session while it runs (its files under data/, the
+raw and filtered .eeg session files and the features CSV, are deleted
+afterwards; run app.py from this folder). --slow clients stop reading once
+connected, like a stalled browser tab; the others should keep their full
+frame rate while the server thins the stalled ones (see "fanout" in
+GET /api/pipeline).
+
+Clients speak Engine.IO v4 over a plain websocket, so no client library
+is needed and hundreds of them fit in one process.
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+
+# -------- MINIMAL WEBSOCKET CLIENT --------
+class WebSocket:
+    """Just enough RFC 6455 for Engine.IO: text/binary frames, ping, close"""
+
+    def __init__(self, host, port, path, rcvbuf=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.settimeout(10)
+        self.sock.connect((host, port))
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        response = b""
+        while b"\r\n\r\n" not in response:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("connection closed during handshake")
+            response += data
+        head, self.buffer = response.split(b"\r\n\r\n", 1)
+        if b" 101 " not in head.split(b"\r\n", 1)[0]:
+            raise ConnectionError(head.split(b"\r\n", 1)[0].decode())
+        self.sock.settimeout(None)
+
+    def _read(self, n):
+        while len(self.buffer) < n:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("connection closed")
+            self.buffer += data
+        out, self.buffer = self.buffer[:n], self.buffer[n:]
+        return out
+
+    def send(self, payload, opcode=1):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        mask = os.urandom(4)
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, 0x80 | n)
+        elif n < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, n)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def receive(self):
+        """Next (opcode, payload) data frame, answering pings on the way"""
+        while True:
+            b0, b1 = self._read(2)
+            opcode, n = b0 & 0x0F, b1 & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", self._read(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", self._read(8))[0]
+            payload = self._read(n)
+            if opcode == 9:
+                self.send(payload, opcode=10)
+            elif opcode == 8:
+                raise ConnectionError("closed by server")
+            elif opcode in (1, 2):
+                return opcode, payload
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+# -------- SIMULATED DASHBOARD --------
+class Viewer(threading.Thread):
+    """One dashboard: connects, reports its plot size, counts waveform frames"""
+
+    def __init__(self, url, width, seconds, slow):
+        super().__init__(daemon=True)
+        self.url = urlparse(url)
+        self.width = width
+        self.seconds = seconds
+        self.slow = slow
+        self.frames = 0
+        self.bytes = 0
+        self.predictions = 0
+        self.connected = threading.Event()
+        self.saved = threading.Event()  # recording_saved arrived
+        self.error = None
+        self.ws = None
+
+    def run(self):
+        try:
+            # A small receive window makes a stalled client back up quickly
+            self.ws = WebSocket(self.url.hostname, self.url.port or 80,
+                                "/socket.io/?EIO=4&transport=websocket",
+                                rcvbuf=4096 if self.slow else None)
+            while True:
+                opcode, payload = self.ws.receive()
+                if opcode == 2:
+                    self.bytes += len(payload)  # binary attachment of a frame
+                    continue
+                text = payload.decode()
+                if text.startswith("0"):
+                    self.ws.send("40")  # open -> join the default namespace
+                elif text == "2":
+                    self.ws.send("3")  # Engine.IO ping -> pong
+                elif text.startswith("40"):
+                    view = {"width": self.width, "seconds": self.seconds}
+                    self.ws.send("42" + json.dumps(["waveform_view", view]))
+                    self.connected.set()
+                    if self.slow:
+                        return  # a stalled tab: stop reading, let the TCP buffers fill
+                elif text.startswith("4"):
+                    self.bytes += len(payload)
+                    if '"waveform_frame"' in text:
+                        self.frames += 1
+                    elif '"prediction_data"' in text:
+                        self.predictions += 1
+                    elif '"recording_saved"' in text:
+                        self.saved.set()
+        except (OSError, ConnectionError) as e:
+            self.error = str(e)
+            self.connected.set()
+
+
+def post(url, path, body=None):
+    request = urllib.request.Request(url + path, data=json.dumps(body or {}).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def get(url, path):
+    with urllib.request.urlopen(url + path, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate N dashboard clients of app.py")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--slow", type=int, default=0, help="clients that stop reading")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--width", type=int, default=1000, help="reported plot width (px)")
+    parser.add_argument("--span", type=float, default=4.0, help="reported plot span (s)")
+    parser.add_argument("--port", help="serial port to connect and record from during the test")
+    args = parser.parse_args()
+
+    viewers = [Viewer(args.url, args.width, args.span, i < args.slow) for i in range(args.clients)]
+    for viewer in viewers:
+        viewer.start()
+    for viewer in viewers:
+        viewer.connected.wait(15)
+    failed = [v for v in viewers if v.error or not v.connected.is_set()]
+    print(f"Connected {len(viewers) - len(failed)}/{len(viewers)} clients ({args.slow} slow)")
+
+    if args.port:
+        print(post(args.url, "/api/connect", {"port": args.port})["message"])
+        print(post(args.url, "/api/start_recording", {"mode": "load_test"})["message"])
+
+    start = time.time()
+    before = [(v.frames, v.bytes) for v in viewers]
+    time.sleep(args.seconds)
+    elapsed = time.time() - start
+    after = [(v.frames, v.bytes) for v in viewers]
+
+    if args.port:
+        post(args.url, "/api/stop_recording")
+        # The session is written and processed in the background; wait for it
+        listening = [v for v in viewers if not v.slow and not v.error]
+        if listening:
+            listening[0].saved.wait(30)
+        # Remove the throwaway session so it cannot be mistaken for calibration data
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+        for path in glob.glob(os.path.join(data_dir, "*", "load_test_*")):
+            os.remove(path)
+
+    fast = [(a[0] - b[0], a[1] - b[1]) for v, b, a in zip(viewers, before, after)
+            if not v.slow and not v.error]
+    if fast:
+        fps = sorted(f / elapsed for f, _ in fast)
+        kbps = sum(b for _, b in fast) / elapsed / len(fast) / 1024
+        print(f"\nFast clients: {len(fast)}")
+        print(f"  frames/s   min {fps[0]:.1f}  median {fps[len(fps) // 2]:.1f}  max {fps[-1]:.1f}")
+        print(f"  KiB/s per client {kbps:.2f}")
+
+    stats = get(args.url, "/api/pipeline")
+    print("\nServer:")
+    print(f"  emit queue  {stats['emit']}")
+    print(f"  fan-out     {stats['fanout']}")
+
+    for viewer in viewers:
+        if viewer.ws:
+            viewer.ws.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+EEG Calmness Monitor - Worker Pipeline
+Bounded queues with explicit backpressure between the live stages
+(serial reader -> DSP/inference worker -> socket.io emitter)
+"""
+
+import threading
+from collections import deque
+
+POLICIES = ("drop_oldest", "block", "coalesce")
+
+
+class _Control:
+    """Queued out-of-band item (see BoundedQueue.put_control)"""
+
+    def __init__(self, item):
+        self.item = item
+
+
+class BoundedQueue:
+    """Bounded FIFO between two pipeline stages.
+
+    When the queue is full, ``put()`` follows ``policy``:
+
+    - ``"drop_oldest"``: discard the oldest queued item to make room
+    - ``"block"``: wait for room for up to ``timeout`` seconds (None waits
+      forever); if there is still none, the new item is dropped. Producers
+      that must never wait, like the serial reader, pass ``timeout=0``
+    - ``"coalesce"``: fold the new item into the newest queued one with
+      ``merge(old, new)`` (default: keep the new one)
+
+    ``put_control()`` queues an out-of-band item, such as an end-of-session
+    marker, behind everything already queued; it is never dropped, merged
+    into or made to wait.
+
+    ``stats()`` reports the current and peak depth and how many items were
+    queued, taken, dropped and coalesced.
+    """
+
+    def __init__(self, name, maxsize, policy="drop_oldest", merge=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.name = name
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.merge = merge or (lambda old, new: new)
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.queued = 0
+        self.taken = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item, timeout=None):
+        """Queue an item; returns False if an item had to be dropped"""
+        with self.cond:
+            self.queued += 1
+            kept = True
+            if len(self.items) >= self.maxsize:
+                if self.policy == "coalesce":
+                    if not isinstance(self.items[-1], _Control):
+                        self.items[-1] = self.merge(self.items[-1], item)
+                        self.coalesced += 1
+                        return True
+                    # Nothing to fold into behind a control item: queue past the limit
+                elif self.policy == "drop_oldest":
+                    oldest = next((i for i, queued in enumerate(self.items)
+                                   if not isinstance(queued, _Control)), None)
+                    if oldest is not None:
+                        del self.items[oldest]
+                        self.dropped += 1
+                        kept = False
+                elif not self.cond.wait_for(lambda: len(self.items) < self.maxsize, timeout):
+                    self.dropped += 1
+                    return False
+
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify_all()
+            return kept
+
+    def put_control(self, item):
+        """Queue `item` after everything queued so far, regardless of the size limit"""
+        with self.cond:
+            self.queued += 1
+            self.items.append(_Control(item))
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        """Take the oldest item, waiting for one; None on timeout"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            item = self.items.popleft()
+            if isinstance(item, _Control):
+                item = item.item
+            self.taken += 1
+            self.cond.notify_all()  # wake a producer blocked on a full queue
+            return item
+
+    def clear(self):
+        """Discard everything queued"""
+        with self.cond:
+            self.items.clear()
+            self.cond.notify_all()
+
+    def stats(self):
+        """Depth and counters for status reporting"""
+        return {
+            'depth': len(self.items),
+            'max_depth': self.max_depth,
+            'maxsize': self.maxsize,
+            'policy': self.policy,
+            'queued': self.queued,
+            'taken': self.taken,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+
+def run_stage(queue, handler):
+    """Worker loop: hand every item of `queue` to `handler`, forever"""
+    while True:
+        item = queue.get()
+        try:
+            handler(item)
+        except Exception as e:
+            # Keep the stage alive; one bad item must not stop the pipeline
+            print(f"[{queue.name}] stage error: {e}")
@@ -0,0 +1,163 @@
+"""
+EEG Calmness Monitor - Chunked Recorder
+Streams recording sessions to disk from a writer thread in fixed-size
+chunks, so memory stays flat however long a session runs. Sessions go
+to binary session files (.eeg, see session.py) or CSV
+"""
+
+import os
+import queue
+import threading
+
+import numpy as np
+
+from session import EXTENSION, SessionWriter
+
+
+class DiskWriter:
+    """Writer thread shared by any number of recorders.
+
+    Commands from all of them are carried out in the order they were
+    queued, so a file closed after another one is on disk after it too.
+    """
+
+    def __init__(self):
+        self.commands = queue.Queue()
+        self.written = 0  # chunks written in total
+
+    def run(self):
+        """Writer loop, call on a dedicated (daemon) thread"""
+        while True:
+            recorder, command = self.commands.get()
+            try:
+                recorder._execute(command)
+            except Exception as e:
+                print(f"Recorder error ({recorder.path}): {e}")
+
+
+class ChunkedRecorder:
+    """Append rows to a file per session without holding the session in memory.
+
+    A path ending in .eeg is written as a session file, and `fmt` holds one
+    NumPy dtype per column; any other path is a CSV, and `fmt` holds one
+    printf format per column.
+
+    ``append()`` (producer thread) copies rows into a preallocated
+    ``chunk_samples`` x ``len(columns)`` array; each full chunk goes to the
+    ``writer`` (a ``DiskWriter``, whose ``run()`` needs a thread), which
+    writes it out and recycles the array. Only the chunks in flight are
+    ever allocated (normally one or two).
+
+    A session is written to ``path + ".part"`` and renamed to ``path`` once
+    the writer has flushed it, so an aborted (or discarded) session never
+    replaces an earlier file. ``open(path, meta)`` puts `meta` (fs, adc_max,
+    vref, start_time, filter, ...) in a session file's header and
+    ``close(meta=...)`` adds what is only known at the end; CSVs ignore
+    both. ``close()`` returns at once; its
+    ``on_closed(path, samples)`` is then called from the writer thread.
+    Sessions are written in order, so a new one can be opened while the
+    last is still being flushed.
+    """
+
+    def __init__(self, writer, columns, fmt, chunk_samples=1024):
+        self.writer = writer
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.chunk_samples = chunk_samples
+        self.lock = threading.Lock()  # append() vs open()/close()
+        self.free = []  # written chunk arrays, ready for reuse
+        self.chunk = None
+        self.fill = 0
+        self.samples = 0  # rows in the current session
+        self.active = False
+        self.allocated = 0
+        self.file = None  # writer thread side: a file object or SessionWriter
+        self.path = None
+
+    def _new_chunk(self):
+        try:
+            return self.free.pop()
+        except IndexError:
+            self.allocated += 1
+            return np.empty((self.chunk_samples, len(self.columns)))
+
+    def _queue(self, *command):
+        self.writer.commands.put((self, command))
+
+    def _flush(self):
+        if self.fill:
+            self._queue('write', self.chunk, self.fill)
+            self.chunk = self._new_chunk()
+            self.fill = 0
+
+    def open(self, path, meta=None):
+        """Start a session that ends up in `path`"""
+        with self.lock:
+            if self.chunk is None:
+                self.chunk = self._new_chunk()
+            self.fill = 0
+            self.samples = 0
+            self.active = True
+            self._queue('open', path, meta)
+
+    def append(self, *columns):
+        """Queue rows given as one array per column (ignored between sessions)"""
+        with self.lock:
+            if not self.active:
+                return
+            rows = np.column_stack(columns)
+            while len(rows):
+                n = min(len(rows), self.chunk_samples - self.fill)
+                self.chunk[self.fill:self.fill + n] = rows[:n]
+                self.fill += n
+                self.samples += n
+                rows = rows[n:]
+                if self.fill == self.chunk_samples:
+                    self._flush()
+
+    def close(self, on_closed=None, discard=False, meta=None):
+        """End the session; returns its row count without waiting for the disk.
+
+        With `discard` the partial file is deleted instead of replacing `path`.
+        """
+        with self.lock:
+            if not self.active:
+                return 0
+            self._flush()
+            self.active = False
+            self._queue('close', self.samples, on_closed, discard, meta)
+            return self.samples
+
+    def _execute(self, command):
+        """Carry out one queued command (writer thread)"""
+        if command[0] == 'open':
+            _, self.path, meta = command
+            if self.path.endswith(EXTENSION):
+                self.file = SessionWriter(self.path + ".part", zip(self.columns, self.fmt),
+                                          meta or {}, self.chunk_samples)
+            else:
+                self.file = open(self.path + ".part", "w")
+                self.file.write(",".join(self.columns) + "\n")
+        elif command[0] == 'write':
+            _, chunk, n = command
+            try:
+                if isinstance(self.file, SessionWriter):
+                    self.file.append(*chunk[:n].T)
+                else:
+                    np.savetxt(self.file, chunk[:n], fmt=self.fmt, delimiter=",")
+                self.writer.written += 1
+            finally:
+                self.free.append(chunk)
+        elif command[0] == 'close':
+            _, samples, on_closed, discard, meta = command
+            if isinstance(self.file, SessionWriter):
+                self.file.close(**(meta or {}))
+            else:
+                self.file.close()
+            self.file = None
+            if discard:
+                os.remove(self.path + ".part")
+                return
+            os.replace(self.path + ".part", self.path)
+            if on_closed:
+                on_closed(self.path, samples)
@@ -0,0 +1,167 @@
+"""
+EEG Calmness Monitor - Model Registry
+Versioned model/scaler pairs with metadata, and a live handle the
+predictor can switch between versions without stopping
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from inference import LinearScorer
+
+# One loaded version: the predictor reads ``registry.active`` once per hop
+LoadedModel = namedtuple("LoadedModel", "version scorer meta")
+
+
+class IncompatibleModel(ValueError):
+    """A model version trained under other features or DSP settings"""
+
+
+class ModelRegistry:
+    """Versions of a trained model under ``root/versions/vNNNN/``.
+
+    Each version directory holds ``model.pkl``, ``scaler.pkl``,
+    ``model.npz`` (the pair compiled into a ``LinearScorer``, which is all
+    serving loads) and ``meta.json`` (metrics, features, settings,
+    creation time).
+    ``meta.json`` is written last, so a version counts as complete once it
+    exists and a reader never sees a half-written one. Several processes
+    may ``save()`` at once: version numbers are claimed with ``mkdir``.
+
+    ``active`` is the version the live predictor uses. ``activate()``
+    swaps it with a single reference assignment, so a hop uses either the
+    old or the new version, never a mix, and no samples are touched.
+    ``watch()`` (on its own thread) preloads versions as they appear, so
+    activating them later costs no disk I/O or unpickling on the hot path.
+
+    ``config`` (``{"features": [...], "settings": {...}}``) describes the
+    running pipeline. A version whose metadata names other features or
+    other settings was trained on different inputs, and ``load()`` refuses
+    it with ``IncompatibleModel``; keys a version does not record (older
+    versions) are not checked.
+    """
+
+    def __init__(self, root, keep_loaded=3, config=None):
+        self.root = root
+        self.config = config
+        self.versions_dir = os.path.join(root, "versions")
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self.keep_loaded = keep_loaded
+        self.lock = threading.Lock()
+        self.loaded = {}  # version -> LoadedModel (preloaded cache)
+        self.active = None
+
+    # -------- STORAGE --------
+    def versions(self):
+        """Complete versions, oldest first"""
+        names = sorted(name for name in os.listdir(self.versions_dir) if name.startswith("v"))
+        return [name for name in names
+                if os.path.exists(os.path.join(self.versions_dir, name, "meta.json"))]
+
+    def latest(self):
+        """Newest complete version, or None"""
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def metadata(self, version):
+        with open(os.path.join(self.versions_dir, version, "meta.json")) as f:
+            return json.load(f)
+
+    def save(self, model, scaler, meta=None, files=None):
+        """Store a new version; returns its name.
+
+        `files` maps extra file names (e.g. a text report) to their contents.
+        """
+        import joblib  # training side only; serving loads model.npz
+        existing = [int(name[1:]) for name in os.listdir(self.versions_dir)
+                    if name.startswith("v") and name[1:].isdigit()]
+        number = max(existing, default=0) + 1
+        while True:
+            version = f"v{number:04d}"
+            path = os.path.join(self.versions_dir, version)
+            try:
+                os.mkdir(path)
+                break
+            except FileExistsError:
+                number += 1
+
+        joblib.dump(model, os.path.join(path, "model.pkl"))
+        joblib.dump(scaler, os.path.join(path, "scaler.pkl"))
+        LinearScorer.fold(model, scaler).save(os.path.join(path, "model.npz"))
+        for name, content in (files or {}).items():
+            with open(os.path.join(path, name), "w") as f:
+                f.write(content)
+        meta = dict(meta or {}, version=version, created=time.time())
+        with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+        return version
+
+    def check(self, meta):
+        """Raise IncompatibleModel if `meta` was trained under another config"""
+        if not self.config:
+            return
+        expected = self.config.get("features")
+        if expected is not None and meta.get("features") not in (None, list(expected)):
+            raise IncompatibleModel(f"{meta.get('version')} was trained on features "
+                                    f"{meta['features']}, the pipeline computes {list(expected)}")
+        settings = meta.get("settings") or {}
+        for key, value in (self.config.get("settings") or {}).items():
+            if key in settings and settings[key] != value:
+                raise IncompatibleModel(f"{meta.get('version')} was trained with {key}={settings[key]}, "
+                                        f"the pipeline runs with {key}={value}")
+
+    # -------- LIVE HANDLE --------
+    def load(self, version):
+        """Loaded version, from the cache when preloaded"""
+        with self.lock:
+            loaded = self.loaded.get(version)
+        if loaded is None:
+            path = os.path.join(self.versions_dir, version)
+            meta = self.metadata(version)
+            self.check(meta)
+            if os.path.exists(os.path.join(path, "model.npz")):
+                scorer = LinearScorer.load(os.path.join(path, "model.npz"))
+            else:
+                import joblib
+                scorer = LinearScorer.fold(joblib.load(os.path.join(path, "model.pkl")),
+                                           joblib.load(os.path.join(path, "scaler.pkl")))
+            loaded = LoadedModel(version, scorer, meta)
+            with self.lock:
+                self.loaded[version] = loaded
+                # Keep the newest few and whatever is active
+                active = self.active.version if self.active else None
+                for old in sorted(self.loaded)[:-self.keep_loaded]:
+                    if old != active:
+                        del self.loaded[old]
+        return loaded
+
+    def activate(self, version=None):
+        """Switch the live predictor to `version` (default: latest); returns it"""
+        version = version or self.latest()
+        if version is None:
+            return None
+        self.active = self.load(version)
+        return self.active
+
+    def watch(self, interval=2.0, on_loaded=None):
+        """Preload new versions as they appear, forever; call on a daemon thread.
+
+        ``on_loaded(loaded)`` is called for each newly preloaded version.
+        """
+        seen = set(self.versions())
+        while True:
+            time.sleep(interval)
+            try:
+                for version in self.versions():
+                    if version in seen:
+                        continue
+                    seen.add(version)
+                    loaded = self.load(version)
+                    if on_loaded:
+                        on_loaded(loaded)
+            except Exception as e:
+                print(f"Model registry watch error: {e}")
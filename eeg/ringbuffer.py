@@ -0,0 +1,98 @@
+"""
+EEG Calmness Monitor - Ring Buffer
+Fixed-capacity NumPy sample buffer for the live path
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity ring buffer with zero-copy views of the latest samples.
+
+    Storage is mirrored: every sample is written at position ``i`` and
+    ``i + capacity`` of a ``2 * capacity`` array, so the most recent ``n``
+    samples (``n <= capacity``) are always one contiguous slice and
+    ``latest()`` can return a view instead of a copy.
+
+    ``total`` counts every sample ever appended and is the absolute index
+    used by ``HopScheduler`` (see scheduler.py) to address windows. It is
+    monotonic: ``clear()`` empties the buffer without resetting it.
+
+    Views returned by ``latest()`` alias the storage and are overwritten by
+    later appends; copy them if they must outlive the next append.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self.data = np.zeros(2 * self.capacity, dtype=dtype)
+        self.total = 0
+        self.start = 0  # absolute index of the oldest sample kept after clear()
+
+    def __len__(self):
+        return min(self.total - self.start, self.capacity)
+
+    def clear(self):
+        """Forget all samples (storage is reused, `total` keeps counting)"""
+        self.start = self.total
+
+    def append(self, value):
+        """Append a single sample in O(1)"""
+        pos = self.total % self.capacity
+        self.data[pos] = value
+        self.data[pos + self.capacity] = value
+        self.total += 1
+
+    def extend(self, chunk):
+        """Append a 1-D array of samples; only the last `capacity` are kept"""
+        chunk = np.asarray(chunk, dtype=self.data.dtype).ravel()
+        n = len(chunk)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.total += n - self.capacity
+            chunk = chunk[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        pos = self.total % cap
+        first = min(n, cap - pos)
+        # Lower copy (wraps to the start) and mirrored upper copy
+        self.data[pos:pos + first] = chunk[:first]
+        self.data[pos + cap:pos + cap + first] = chunk[:first]
+        if first < n:
+            self.data[:n - first] = chunk[first:]
+            self.data[cap:cap + n - first] = chunk[first:]
+        self.total += n
+
+    def latest(self, n, end=None):
+        """Contiguous view of `n` samples ending at absolute index `end` (default: newest)"""
+        total = self.total  # read once, a writer thread may be appending
+        if end is None:
+            end = total
+        lag = total - end
+        if n < 0 or lag < 0 or lag + n > min(total - self.start, self.capacity):
+            raise IndexError(
+                f"window of {n} samples ending at {end} is not in the buffer "
+                f"(total={total}, capacity={self.capacity})"
+            )
+        stop = total % self.capacity + self.capacity - lag
+        return self.data[stop - n:stop]
+
+    def snapshot(self, n):
+        """Copy of up to the newest `n` samples while another thread appends.
+
+        Returns ``(start, samples)`` where ``start`` is the absolute index of
+        the first sample. No lock: the last quarter of the capacity is kept
+        as headroom for a chunk the writer is still copying in (it bumps
+        `total` only afterwards), and the copy is retried if the writer got
+        into that headroom meanwhile. At most 3/4 of the capacity is returned.
+        """
+        usable = self.capacity - self.capacity // 4
+        while True:
+            end = self.total
+            count = min(n, end - self.start, usable)
+            samples = self.latest(count, end).copy()
+            if self.total - end + count <= usable:
+                return end - count, samples
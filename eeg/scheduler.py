@@ -0,0 +1,77 @@
+"""
+EEG Calmness Monitor - Hop Scheduler
+Decides when windowed consumers (prediction, spectrogram, artifact
+detection, ...) run, based on a monotonic count of received samples.
+"""
+
+import threading
+
+
+class HopConsumer:
+    """One registered consumer with its own window/hop schedule"""
+
+    def __init__(self, name, window, hop, callback):
+        if window <= 0 or hop <= 0:
+            raise ValueError("window and hop must be positive sample counts")
+        self.name = name
+        self.window = int(window)
+        self.hop = int(hop)
+        self.callback = callback
+        self.next_due = None  # absolute sample index of the next window end
+        self.evaluations = 0
+
+
+class HopScheduler:
+    """Fire each consumer exactly once per hop of newly received samples.
+
+    The scheduler owns a monotonic sample counter that never wraps or resets
+    while consumers are running, so it keeps working once a fixed-size buffer
+    is full. Due indices are advanced by exactly ``hop`` from the previous due
+    index (not from "now"), so a late call never shifts the schedule.
+
+    Callbacks are called as ``callback(end)`` where ``end`` is the absolute
+    sample index one past the last sample of the window.
+    """
+
+    def __init__(self):
+        self.sample_count = 0
+        self.consumers = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, window, hop, callback):
+        """Register (or replace) a consumer; its first window ends `window` samples from now"""
+        consumer = HopConsumer(name, window, hop, callback)
+        with self.lock:
+            consumer.next_due = self.sample_count + consumer.window
+            self.consumers[name] = consumer
+        return consumer
+
+    def unregister(self, name):
+        """Remove a consumer if registered"""
+        with self.lock:
+            self.consumers.pop(name, None)
+
+    def clear(self):
+        """Remove all consumers"""
+        with self.lock:
+            self.consumers.clear()
+
+    def advance(self, n=1):
+        """Account for `n` new samples and run every consumer that became due.
+
+        Returns a list of ``(name, result)`` tuples, one per evaluation.
+        """
+        with self.lock:
+            self.sample_count += n
+            now = self.sample_count
+            due = []
+            for consumer in self.consumers.values():
+                while consumer.next_due <= now:
+                    due.append((consumer, consumer.next_due))
+                    consumer.next_due += consumer.hop
+
+        results = []
+        for consumer, end in sorted(due, key=lambda item: item[1]):
+            consumer.evaluations += 1
+            results.append((consumer.name, consumer.callback(end)))
+        return results
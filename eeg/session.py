@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+EEG Calmness Monitor - Session Files
+Columnar binary recordings: a header with the acquisition and filter
+settings, then typed columns in fixed-size chunks. Loading one is a
+memory map, not a parse.
+
+    python session.py convert data/calibration/calm_raw.csv   # -> calm_raw.eeg
+    python session.py info data/calibration/calm_raw.eeg
+
+Layout (little-endian):
+
+    offset  type        field
+    0       4s          magic b"EEGR"
+    4       uint16      version (1)
+    6       uint16      column count
+    8       uint32      header size: offset of the first chunk (HEADER_SIZE)
+    12      uint32      chunk_samples
+    16      uint64      samples (0 until the writer closes the file)
+    24      char[]      JSON metadata, zero-padded to the header size:
+                        columns [[name, dtype], ...], fs, adc_max, vref,
+                        start_time (Unix time of sample 0), t0 (session
+                        time of sample 0, s), filter (settings applied to
+                        the samples, null for raw ADC) and any extras
+    header  chunks      chunk_samples values of column 0, then of column 1, ...
+
+Sample i was taken at t0 + i / fs; the sample clock is the device's, so
+there is no time column. The last chunk is zero-padded. A file whose
+writer never closed it (a crash) has samples 0 and reads as its full
+chunks.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+from itertools import islice
+
+import numpy as np
+
+MAGIC = b"EEGR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQ")
+HEADER_SIZE = 4096  # room for the metadata, rewritten in place on close
+EXTENSION = ".eeg"
+
+# dtypes for known CSV columns when converting; anything else is float32
+CSV_COLUMNS = {
+    "ADC": "<u2",
+    "Filtered_Voltage": "<f4",
+}
+TIME_COLUMNS = ("Time(s)", "Time (s)")
+
+
+def session_path(path):
+    """`path` with its extension replaced by .eeg"""
+    return os.path.splitext(path)[0] + EXTENSION
+
+
+def is_session(path):
+    """True for a file in this format (checks the magic, not the name)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# -------- WRITING --------
+class SessionWriter:
+    """Write a session file chunk by chunk.
+
+    ``columns`` is a list of (name, dtype) pairs; ``meta`` goes into the
+    header as is (fs is required). ``append()`` takes one array per
+    column, of any length; full chunks are written as they fill, so only
+    one chunk per column is held in memory. ``close(**meta)`` writes the
+    padded last chunk and the final header, with `meta` merged in (e.g.
+    values only known at the end). Not thread-safe: one writer per file.
+    """
+
+    def __init__(self, path, columns, meta, chunk_samples=1024):
+        self.path = path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.meta = dict(meta)
+        self.chunk_samples = int(chunk_samples)
+        self.chunks = [np.zeros(self.chunk_samples, dtype) for _, dtype in self.columns]
+        self.fill = 0
+        self.samples = 0
+        self.file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        meta = dict(self.meta, columns=[[name, dtype.str] for name, dtype in self.columns])
+        text = json.dumps(meta).encode()
+        if HEADER.size + len(text) > HEADER_SIZE:
+            raise ValueError("session metadata does not fit in the header")
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(self.columns), HEADER_SIZE,
+                                    self.chunk_samples, self.samples))
+        self.file.write(text.ljust(HEADER_SIZE - HEADER.size, b"\0"))
+
+    def _write_chunk(self):
+        for chunk in self.chunks:
+            self.file.write(chunk.tobytes())
+
+    def append(self, *columns):
+        """Add rows given as one array per column"""
+        columns = [np.asarray(column) for column in columns]
+        total = len(columns[0])
+        done = 0
+        while done < total:
+            n = min(total - done, self.chunk_samples - self.fill)
+            for chunk, column in zip(self.chunks, columns):
+                chunk[self.fill:self.fill + n] = column[done:done + n]
+            self.fill += n
+            done += n
+            if self.fill == self.chunk_samples:
+                self._write_chunk()
+                self.fill = 0
+        self.samples += total
+
+    def close(self, **meta):
+        """Write the last (padded) chunk and the final header"""
+        if self.fill:
+            for chunk in self.chunks:
+                chunk[self.fill:] = 0
+            self._write_chunk()
+            self.fill = 0
+        self.meta.update(meta)
+        self._write_header()
+        self.file.close()
+
+
+# -------- READING --------
+class Session:
+    """Memory-mapped session file.
+
+    ``session[name]`` is the column as a 1-D array of ``samples`` values:
+    a read-only view of the file when it has a single column (raw and
+    filtered sessions), a copy otherwise. ``chunks(name)`` walks a column
+    one file chunk at a time without copying, and ``blocks(name, n)`` in
+    blocks of any size (views for single-column files; multi-column files
+    copy one block at a time). ``voltage()`` converts an ADC column with
+    the header's adc_max/vref, ``voltage_blocks()`` does so block by block.
+
+    Nothing is read until it is used, and pages of a view that has been
+    processed can be dropped by the OS, so walking a file in blocks keeps
+    memory flat however long the recording is.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(HEADER_SIZE)
+        magic, version, n_columns, header_size, chunk_samples, samples = HEADER.unpack_from(head)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} EEG session file")
+        self.meta = json.loads(head[HEADER.size:header_size].rstrip(b"\0"))
+        self.columns = [name for name, _ in self.meta["columns"]]
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in self.meta["columns"]}
+        self.chunk_samples = chunk_samples
+        self.fs = self.meta["fs"]
+        self.t0 = self.meta.get("t0", 0.0)
+
+        record = np.dtype([(name, self.dtypes[name], (chunk_samples,)) for name in self.columns])
+        n_chunks = (os.path.getsize(path) - header_size) // record.itemsize
+        self.samples = samples or n_chunks * chunk_samples
+        n_chunks = min(n_chunks, -(-self.samples // chunk_samples))
+        self._records = (np.memmap(path, record, mode="r", offset=header_size, shape=(n_chunks,))
+                         if n_chunks else np.zeros(0, record))
+
+    def __len__(self):
+        return self.samples
+
+    def __getitem__(self, name):
+        return self._records[name].reshape(-1)[:self.samples]
+
+    def chunks(self, name):
+        """Views of one column, chunk_samples values at a time (the last one trimmed)"""
+        column = self._records[name]
+        for i in range(len(column)):
+            yield column[i][:self.samples - i * self.chunk_samples]
+
+    def blocks(self, name, block, start=0, stop=None):
+        """Consecutive pieces of one column, `block` samples each (the last may be shorter)"""
+        stop = self.samples if stop is None else min(stop, self.samples)
+        single = len(self.columns) == 1
+        column = self[name] if single else self._records[name]
+        size = self.chunk_samples
+        for a in range(start, stop, block):
+            b = min(a + block, stop)
+            if single:
+                yield column[a:b]
+            else:
+                first = a // size
+                yield column[first:-(-b // size)].reshape(-1)[a - first * size:b - first * size]
+
+    def times(self):
+        """Session time (s) of every sample"""
+        return self.t0 + np.arange(self.samples) / self.fs
+
+    def volts_per_count(self):
+        """ADC scale from the header"""
+        return self.meta["vref"] / self.meta["adc_max"]
+
+    def voltage(self, name="ADC"):
+        """An ADC column in volts (a full-length float64 array)"""
+        return self[name] * self.volts_per_count()
+
+    def voltage_blocks(self, block, name="ADC"):
+        """An ADC column in volts, `block` samples at a time"""
+        scale = self.volts_per_count()
+        for values in self.blocks(name, block):
+            yield values * scale
+
+
+def read_signal(path, column=None):
+    """One signal column (default: the last) of a session file or a CSV with a header row.
+
+    Session columns are memory-mapped; CSVs are parsed, so convert long ones.
+    """
+    if is_session(path):
+        session = Session(path)
+        return session[column or session.columns[-1]]
+    with open(path) as f:
+        names = f.readline().strip().split(",")
+    index = names.index(column) if column else len(names) - 1
+    return np.loadtxt(path, delimiter=",", skiprows=1, usecols=index, ndmin=1)
+
+
+def read_blocks(path, block, column=None):
+    """One signal column (default: the last) of a session file or CSV, `block` samples at a time.
+
+    Memory stays flat for either format: sessions yield memory-mapped
+    views, CSVs are parsed `block` rows at a time.
+    """
+    if is_session(path):
+        session = Session(path)
+        yield from session.blocks(column or session.columns[-1], block)
+        return
+    with open(path) as f:
+        names = f.readline().strip().split(",")
+        index = names.index(column) if column else len(names) - 1
+        while True:
+            lines = list(islice(f, block))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=",", usecols=index, ndmin=1)
+
+
+def read_times(path):
+    """Sample times (s): from the header of a session file, or a CSV's first column"""
+    if is_session(path):
+        return Session(path).times()
+    return np.loadtxt(path, delimiter=",", skiprows=1, usecols=0, ndmin=1)
+
+
+# -------- CONVERSION --------
+def convert_csv(csv_path, out_path=None, fs=250, adc_max=4095, vref=3.3, filter_config=None,
+                chunk_samples=1024, block_rows=65536):
+    """Convert a CSV recording (Time(s) + signal columns) to a session file.
+
+    The time column becomes t0 (its first value); signal columns get the
+    dtypes in CSV_COLUMNS. Read `block_rows` rows at a time, so files of
+    any length convert in constant memory. Returns the output path.
+    """
+    out_path = out_path or session_path(csv_path)
+    with open(csv_path) as f:
+        names = f.readline().strip().split(",")
+        keep = [i for i, name in enumerate(names) if name not in TIME_COLUMNS]
+        time_index = next((i for i, name in enumerate(names) if name in TIME_COLUMNS), None)
+        columns = [(names[i], CSV_COLUMNS.get(names[i], "<f4")) for i in keep]
+        meta = {"fs": fs, "adc_max": adc_max, "vref": vref, "start_time": None, "t0": 0.0,
+                "filter": filter_config, "source": os.path.basename(csv_path)}
+        writer = SessionWriter(out_path + ".part", columns, meta, chunk_samples)
+        try:
+            while True:
+                lines = list(islice(f, block_rows))
+                if not lines:
+                    break
+                rows = np.loadtxt(lines, delimiter=",", ndmin=2)
+                if writer.samples == 0 and time_index is not None:
+                    writer.meta["t0"] = float(rows[0, time_index])
+                writer.append(*(rows[:, i] for i in keep))
+            writer.close()
+        except Exception:
+            writer.file.close()
+            os.remove(out_path + ".part")
+            raise
+    os.replace(out_path + ".part", out_path)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EEG session files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="convert CSV recordings to session files")
+    convert.add_argument("csv", nargs="+")
+    convert.add_argument("--fs", type=float, default=250)
+    convert.add_argument("--adc-max", type=int, default=4095)
+    convert.add_argument("--vref", type=float, default=3.3)
+    convert.add_argument("--filter", type=json.loads, default=None,
+                         help='JSON of the filter applied, e.g. \'{"lowcut": 0.5, "highcut": 40}\'')
+    info = commands.add_parser("info", help="print a session file's header")
+    info.add_argument("path", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for path in args.csv:
+            out = convert_csv(path, fs=args.fs, adc_max=args.adc_max, vref=args.vref,
+                              filter_config=args.filter)
+            print(f"{path} -> {out} ({os.path.getsize(path) / 1e6:.2f} MB -> "
+                  f"{os.path.getsize(out) / 1e6:.2f} MB)")
+    else:
+        for path in args.path:
+            session = Session(path)
+            print(f"{path}: {session.samples} samples, {session.samples / session.fs:.1f} s")
+            print(json.dumps(session.meta, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
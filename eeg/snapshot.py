@@ -0,0 +1,73 @@
+"""
+EEG Calmness Monitor - Live Snapshot
+Compact binary blob of the last seconds of signal and predictions, so a
+(re)connecting dashboard can fill its charts in one round trip
+
+Layout (little-endian; every array starts 4-byte aligned, so a browser can
+view it with Float32Array without copying):
+
+    offset  type        field
+    0       4s          magic b"EEGS"
+    4       uint16      version (1)
+    6       uint16      mode: 0 idle, 1 recording, 2 prediction
+    8       float32     fs of the raw samples
+    12      float32     fs of the filtered samples
+    16      float64     raw_t0: time (s) of the first raw sample
+    24      float64     filtered_t0: time (s) of the first filtered sample
+    32      float64     server wall-clock time the snapshot was taken
+    40      uint32      raw_count
+    44      uint32      filtered_count
+    48      uint32      prediction_count
+    52      float32[]   raw samples (V)
+    ...     float32[]   filtered samples (V)
+    ...     float32[]   predictions, PREDICTION_FIELDS per row
+
+Times are seconds since the start of the current recording/prediction
+session (the same clock as the live waveform and prediction events), or
+relative to the newest sample (ending at 0) when idle.
+"""
+
+import struct
+
+import numpy as np
+
+MAGIC = b"EEGS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHffdddIII")
+MODES = {None: 0, 'recording': 1, 'prediction': 2}
+PREDICTION_FIELDS = ("time", "alpha", "beta", "ratio", "calm", "confidence")
+
+
+def pack_snapshot(mode, fs, raw, raw_t0, filtered_fs, filtered, filtered_t0, predictions, now):
+    """Pack signal arrays and prediction rows into one snapshot blob"""
+    raw = np.asarray(raw, dtype="<f4")
+    filtered = np.asarray(filtered, dtype="<f4")
+    predictions = np.asarray(predictions, dtype="<f4").reshape(-1, len(PREDICTION_FIELDS))
+    header = HEADER.pack(MAGIC, VERSION, MODES.get(mode, 0), fs, filtered_fs,
+                         raw_t0, filtered_t0, now, len(raw), len(filtered), len(predictions))
+    return b"".join([header, raw.tobytes(), filtered.tobytes(), predictions.tobytes()])
+
+
+def unpack_snapshot(blob):
+    """Decode a snapshot blob into a dict of header fields and arrays"""
+    (magic, version, mode, fs, filtered_fs, raw_t0, filtered_t0, now,
+     raw_count, filtered_count, prediction_count) = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version 1 EEG snapshot")
+    offset = HEADER.size
+    raw = np.frombuffer(blob, "<f4", raw_count, offset)
+    offset += 4 * raw_count
+    filtered = np.frombuffer(blob, "<f4", filtered_count, offset)
+    offset += 4 * filtered_count
+    predictions = np.frombuffer(blob, "<f4", prediction_count * len(PREDICTION_FIELDS), offset)
+    return {
+        'mode': {code: name for name, code in MODES.items()}[mode],
+        'fs': fs,
+        'filtered_fs': filtered_fs,
+        'raw_t0': raw_t0,
+        'filtered_t0': filtered_t0,
+        'time': now,
+        'raw': raw,
+        'filtered': filtered,
+        'predictions': predictions.reshape(-1, len(PREDICTION_FIELDS)),
+    }
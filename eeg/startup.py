@@ -0,0 +1,105 @@
+"""
+EEG Calmness Monitor - Startup Profiler
+``python app.py --profile-startup``: runs the server's start-up once under
+``python -X importtime`` and reports import time per module and the time
+from process start to the server's own socket listening, split into
+phases (module import, one-time model import, server start)
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+MARKER = "STARTUP_MARK"
+READY = "ready"
+TARGET_MS = 300
+
+# Phases of the probe run, each ending at the mark of the same name
+PHASES = (
+    ("main", "imports and module set-up"),
+    ("models", "model import (first run on a fresh registry only)"),
+    (READY, "worker threads and server socket"),
+)
+
+
+def mark(name):
+    """Called by the probe run as each phase ends"""
+    # One write straight to the fd, so no import-time line can split it
+    sys.stderr.flush()
+    os.write(2, f"\n{MARKER} {name} {time.time():.6f}\n".encode())
+
+
+def ready():
+    """Called by the probe run once the server's socket listens: report and exit"""
+    mark(READY)
+    os._exit(0)
+
+
+def parse_importtime(lines):
+    """(name, self ms, cumulative ms, depth) per module from -X importtime output"""
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(own) / 1000, int(cumulative) / 1000, depth))
+    return modules
+
+
+def split_phases(lines):
+    """Import-time lines per phase, and the time each phase's mark was written"""
+    phase_lines = {name: [] for name, _ in PHASES}
+    marks = {}
+    phase = PHASES[0][0]
+    for line in lines:
+        if line.startswith(MARKER):
+            _, name, at = line.split()
+            marks[name] = float(at)
+            later = [p for p, _ in PHASES if p not in marks]
+            phase = later[0] if later else phase
+        elif phase in phase_lines:
+            phase_lines[phase].append(line)
+    return phase_lines, marks
+
+
+def profile_startup(script, top=15):
+    """Start `script` with --startup-probe under -X importtime and print the report"""
+    started = time.time()
+    probe = subprocess.run([sys.executable, "-X", "importtime", script, "--startup-probe"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    lines = probe.stderr.splitlines()
+    phase_lines, marks = split_phases(lines)
+    if READY not in marks:
+        print("Start-up probe exited before its socket was ready:")
+        print("\n".join(line for line in lines if not line.startswith("import time:")))
+        return 1
+
+    modules = parse_importtime(lines)
+    imports_ms = sum(own for _, own, _, _ in modules)
+    ready_ms = (marks[READY] - started) * 1000
+    print(f"\nStart-up: {ready_ms:.0f} ms from process start to a listening socket "
+          f"(target {TARGET_MS} ms), {imports_ms:.0f} ms of it in {len(modules)} imports\n")
+
+    print("Phases (wall ms, of which imports):")
+    previous = started
+    for name, label in PHASES:
+        at = marks.get(name, previous)
+        phase_imports = sum(own for _, own, _, _ in parse_importtime(phase_lines[name]))
+        print(f"  {(at - previous) * 1000:8.1f}  {phase_imports:8.1f}  {label}")
+        previous = at
+    model_ms = (marks["models"] - marks["main"]) * 1000
+    if model_ms >= 1.0:
+        print(f"  Without the one-time model import: {ready_ms - model_ms:.0f} ms")
+
+    print("\nTop-level imports (cumulative ms):")
+    for name, _, cumulative, depth in sorted(modules, key=lambda m: -m[2]):
+        if depth == 0 and cumulative >= 1.0:
+            print(f"  {cumulative:8.1f}  {name}")
+
+    print(f"\nSlowest {top} modules (self ms, excluding their own imports):")
+    for name, own, _, _ in sorted(modules, key=lambda m: -m[1])[:top]:
+        print(f"  {own:8.1f}  {name}")
+    print()
+    return 0
@@ -0,0 +1,342 @@
+"""
+EEG Calmness Monitor - Training
+Signal and feature settings shared by the live server and the offline
+pipeline, plus the offline jobs (reprocessing, training). Imports nothing
+of the server, so job workers load only this module and what it needs
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+
+from dsp import (
+    eeg_filter, sliding_windows, batch_welch, FeatureBank, EEG_BANDS, Decimator, decimated_rate,
+    OverlapStream, WindowStream,
+)
+from jobs import report as report_progress
+from registry import ModelRegistry
+from session import Session, SessionWriter, is_session, read_blocks
+
+
+# -------- SETTINGS --------
+FS = 250                    # Sampling rate (Hz)
+ADC_MAX = 4095
+VREF = 3.3
+
+LOWCUT = 0.5
+HIGHCUT = 40
+NOTCH = 50
+Q = 30
+
+WINDOW_SEC = 2.0
+STEP_SEC = 0.5
+
+# Welch segment length/overlap. When NPERSEG - NOVERLAP divides the hop,
+# IncrementalWelch transforms only the new segments of each window (causal
+# mode); otherwise, as here (128 vs 125), it computes each window in one
+# batch. 250/125 would reuse all but one segment per hop, but moves the
+# bins from 0.98 to 1 Hz and changes the features (retrain after)
+NPERSEG = 256
+NOVERLAP = None             # welch default: NPERSEG // 2
+
+ALPHA_BAND = (8, 13)
+BETA_BAND = (13, 30)
+
+# Features written to *_features.csv and fed to the model. Any name in
+# FEATURE_BANK.names can be added (band/relative powers, peak frequency,
+# centroid, slope); all of them come from the same single PSD per window
+MODEL_FEATURES = ["Alpha", "Beta", "AlphaBetaRatio"]
+FEATURE_COLUMNS = ["Window"] + MODEL_FEATURES  # *_features.csv
+FEATURE_FMT = ["%d"] + ["%.12g"] * len(MODEL_FEATURES)
+FEATURE_BANDS = dict(EEG_BANDS, alpha=ALPHA_BAND, beta=BETA_BAND)
+
+# Optional polyphase decimation after filtering, to the lowest rate that
+# still covers the highest feature band (250 -> 100 Hz for 40 Hz). Windows,
+# hops, nperseg, FFTs, the filtered ring and *_filtered.eeg all shrink with
+# it. Changing it changes the features, so recalibrate and retrain after
+DECIMATE = False
+if DECIMATE:
+    DSP_FS, DSP_UP, DSP_DOWN = decimated_rate(
+        FS, max(high for _, high in FEATURE_BANDS.values()), WINDOW_SEC, STEP_SEC
+    )
+else:
+    DSP_FS, DSP_UP, DSP_DOWN = FS, 1, 1
+DSP_NPERSEG = int(round(NPERSEG * DSP_FS / FS))
+DSP_NOVERLAP = None if NOVERLAP is None else int(round(NOVERLAP * DSP_FS / FS))
+
+# Calibration sessions are written to disk by a writer thread in chunks of
+# this many samples, so memory stays flat however long the session
+RECORD_CHUNK = 1024
+
+# Reprocessing a recording: "chunked" walks the memory-mapped file in
+# blocks of REPROCESS_BLOCK_SEC through the same blockwise filter and
+# writes results as they settle, so memory stays flat for recordings of
+# any length; "whole" loads and filters the file in one pass (several
+# full-length copies in memory). Offline there is no latency to keep
+# down, so the margin is wide enough (30 s) for "chunked" to equal
+# "whole" to rounding (~1e-13 V)
+REPROCESS_MODE = "chunked"
+REPROCESS_BLOCK_SEC = 60.0
+REPROCESS_MARGIN_SEC = 30.0
+
+# Stored with every model version; versions trained under other features
+# or DSP settings are refused when loaded. The live FILTER_MODE (app.py) is
+# not among them: it only changes the live path, calibration features
+# are always filtered zero-phase (TRAIN_FILTER), so a mismatch is only
+# warned about
+MODEL_CONFIG = {
+    'features': MODEL_FEATURES,
+    'settings': {'fs': FS, 'dsp_fs': DSP_FS, 'window_sec': WINDOW_SEC, 'step_sec': STEP_SEC,
+                 'filter': [LOWCUT, HIGHCUT, NOTCH, Q]},
+}
+TRAIN_FILTER = "zero_phase"
+
+# Paths
+DATA_DIR = "data"
+CALIBRATION_DIR = os.path.join(DATA_DIR, "calibration")
+PIPELINE_DIR = os.path.join(DATA_DIR, "pipeline_output")
+MODEL_DIR = os.path.join(DATA_DIR, "models")
+RESULTS_DIR = os.path.join(DATA_DIR, "results")
+
+# Spectral feature bank for the Welch grid used live and offline
+FEATURE_BANK = FeatureBank.for_welch(DSP_FS, DSP_NPERSEG, int(WINDOW_SEC * DSP_FS), FEATURE_BANDS)
+MODEL_FEATURE_INDEX = FEATURE_BANK.index(MODEL_FEATURES)
+BETA_INDEX = FEATURE_BANK.index(["Beta"])[0]
+
+
+# -------- FILTERS --------
+def filter_eeg(data):
+    """Apply the fused bandpass + notch cascade (one zero-phase pass)"""
+    return eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q).apply(data)
+
+
+# Offline resampler to DSP_FS (pass-through unless DECIMATE)
+DECIMATOR = Decimator(DSP_UP, DSP_DOWN)
+
+
+def calibration_signal(voltage):
+    """Offline calibration transform: zero-phase filter, then resample to DSP_FS"""
+    return DECIMATOR.apply(filter_eeg(voltage))
+
+
+# -------- SESSION FILES --------
+def session_meta(fs, start_time, filtered):
+    """Header of a raw (ADC) or filtered session file (see session.py)"""
+    return {
+        'fs': fs,
+        'adc_max': ADC_MAX,
+        'vref': VREF,
+        'start_time': start_time,
+        't0': 0.0,
+        'filter': {'lowcut': LOWCUT, 'highcut': HIGHCUT, 'notch': NOTCH, 'q': Q, 'order': 4,
+                   'zero_phase': True, 'input_fs': FS} if filtered else None,
+    }
+
+
+# -------- OFFLINE JOBS --------
+def window_features(windows):
+    """Model feature rows of filtered windows; windows without beta power are skipped"""
+    if len(windows) == 0:
+        return np.empty((0, len(MODEL_FEATURES)))
+    _, psd = batch_welch(windows, DSP_FS, DSP_NPERSEG, DSP_NOVERLAP)
+    values = FEATURE_BANK.compute(psd)
+    return values[values[:, BETA_INDEX] != 0][:, MODEL_FEATURE_INDEX]
+
+
+def process_calibration_file(filename, label):
+    """Process a calibration file through the pipeline"""
+    print(f"Processing: {filename}")
+    path = os.path.join(CALIBRATION_DIR, filename)
+    if REPROCESS_MODE == "chunked":
+        return process_calibration_chunked(path, label)
+    import pandas as pd  # offline only (job workers)
+
+    # Load raw data (memory-mapped) and convert ADC to voltage
+    report_progress(0.1, "Loading raw data")
+    if is_session(path):
+        raw = Session(path)
+        voltage = raw.voltage()
+        t0, start_time = raw.t0, raw.meta.get('start_time')
+    else:
+        df = pd.read_csv(path)  # recorded before session files
+        voltage = (df["ADC"].values / ADC_MAX) * VREF
+        t0, start_time = float(df["Time(s)"].values[0]), None
+
+    # Filtering, then resampling to the DSP rate
+    report_progress(0.3, "Filtering")
+    filtered = calibration_signal(voltage)
+
+    # Save filtered EEG
+    filtered_path = os.path.join(PIPELINE_DIR, f"{label}_filtered.eeg")
+    writer = SessionWriter(filtered_path + ".part", [("Filtered_Voltage", "<f4")],
+                           dict(session_meta(DSP_FS, start_time, True), t0=t0), RECORD_CHUNK)
+    writer.append(filtered)
+    writer.close()
+    os.replace(filtered_path + ".part", filtered_path)
+
+    # Sliding window feature extraction
+    window_size = int(WINDOW_SEC * DSP_FS)
+    step_size = int(STEP_SEC * DSP_FS)
+
+    # All windows at once: strided view, batched rFFT, feature bank matmuls
+    report_progress(0.6, "Extracting features")
+    values = window_features(sliding_windows(filtered, window_size, step_size))
+
+    # Save features
+    feature_df = pd.DataFrame(values, columns=MODEL_FEATURES)
+    feature_df.insert(0, "Window", np.arange(1, len(values) + 1))
+
+    feature_df.to_csv(
+        os.path.join(PIPELINE_DIR, f"{label}_features.csv"),
+        index=False
+    )
+
+    return len(feature_df)
+
+
+def process_calibration_chunked(path, label):
+    """process_calibration_file in constant memory (REPROCESS_MODE "chunked").
+
+    The raw file is read in REPROCESS_BLOCK_SEC blocks (memory-mapped views
+    of a session file) and run through the live calibration path:
+    OverlapStream for the zero-phase filter (with REPROCESS_MARGIN_SEC of
+    context), WindowStream for the windows.
+    Filtered samples and feature rows are appended to the output files as
+    they settle; only a block, its filter margins and one window are held.
+    """
+    block = int(REPROCESS_BLOCK_SEC * FS)
+    report_progress(0.05, "Opening raw data")
+    if is_session(path):
+        raw = Session(path)
+        t0, start_time, total = raw.t0, raw.meta.get('start_time'), raw.samples
+        voltage_blocks = raw.voltage_blocks(block)
+    else:
+        # Recorded before session files: parsed block by block
+        t0, start_time = float(next(read_blocks(path, 1, "Time(s)"))[0]), None
+        with open(path) as f:
+            total = sum(1 for _ in f) - 1
+        voltage_blocks = (values * (VREF / ADC_MAX) for values in read_blocks(path, block, "ADC"))
+
+    stream = OverlapStream(calibration_signal, int(REPROCESS_MARGIN_SEC * FS), block, DSP_UP, DSP_DOWN)
+    windows = WindowStream(int(WINDOW_SEC * DSP_FS), int(STEP_SEC * DSP_FS))
+    filtered_path = os.path.join(PIPELINE_DIR, f"{label}_filtered.eeg")
+    features_path = os.path.join(PIPELINE_DIR, f"{label}_features.csv")
+    writer = SessionWriter(filtered_path + ".part", [("Filtered_Voltage", "<f4")],
+                           dict(session_meta(DSP_FS, start_time, True), t0=t0), RECORD_CHUNK)
+    features = open(features_path + ".part", "w")
+    features.write(",".join(FEATURE_COLUMNS) + "\n")
+    count = 0
+
+    def settle(filtered):
+        nonlocal count
+        writer.append(filtered)
+        values = window_features(windows.push(filtered))
+        numbers = count + 1 + np.arange(len(values))
+        np.savetxt(features, np.column_stack([numbers, values]), fmt=FEATURE_FMT, delimiter=",")
+        count += len(values)
+
+    try:
+        done = 0
+        for voltage in voltage_blocks:
+            settle(stream.push(voltage))
+            done += len(voltage)
+            report_progress(0.05 + 0.9 * done / max(total, 1), "Filtering and extracting features")
+        settle(stream.finish())
+        writer.close()
+        features.close()
+    except BaseException:
+        writer.file.close()
+        features.close()
+        os.remove(filtered_path + ".part")
+        os.remove(features_path + ".part")
+        raise
+    os.replace(filtered_path + ".part", filtered_path)
+    os.replace(features_path + ".part", features_path)
+    return count
+
+
+def train_model():
+    """Train the ML model on calibration data"""
+    # pandas, joblib and sklearn are only needed here (in a job worker);
+    # serving uses the compiled LinearScorer
+    import joblib
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
+
+    # Check if feature files exist
+    calm_path = os.path.join(PIPELINE_DIR, "calm_features.csv")
+    not_calm_path = os.path.join(PIPELINE_DIR, "not_calm_features.csv")
+
+    if not os.path.exists(calm_path) or not os.path.exists(not_calm_path):
+        return False, "Missing calibration data. Please collect both calm and not calm sessions first."
+
+    # Load features
+    report_progress(0.1, "Loading features")
+    calm = pd.read_csv(calm_path)
+    not_calm = pd.read_csv(not_calm_path)
+
+    # Add labels
+    calm["Label"] = "Calm"
+    not_calm["Label"] = "Not Calm"
+
+    # Combine and shuffle
+    data = pd.concat([calm, not_calm], ignore_index=True)
+    data = data.sample(frac=1, random_state=42).reset_index(drop=True)
+
+    # Features and labels
+    X = data[MODEL_FEATURES].values
+    y = data["Label"].values
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train/test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=0.3, random_state=42, stratify=y
+    )
+
+    # Train model
+    report_progress(0.4, "Fitting model")
+    model = LogisticRegression(max_iter=1000, class_weight="balanced")
+    model.fit(X_train, y_train)
+
+    # Evaluate
+    report_progress(0.8, "Evaluating")
+    y_pred = model.predict(X_test)
+    accuracy = (y_pred == y_test).mean()
+
+    # Training report
+    report = classification_report(y_test, y_pred)
+    text = "".join([
+        "EEG CALMNESS MODEL TRAINING REPORT\n",
+        "=" * 50 + "\n\n",
+        f"Training Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+        f"Total Samples: {len(data)}\n",
+        f"Calm Samples: {len(calm)}\n",
+        f"Not Calm Samples: {len(not_calm)}\n",
+        f"Test Accuracy: {accuracy:.2%}\n\n",
+        "Classification Report:\n",
+        report,
+    ])
+
+    # Save model and scaler as a new registry version (the live predictor
+    # picks it up from there), plus the latest copies in data/models
+    report_progress(0.9, "Saving model")
+    version = ModelRegistry(MODEL_DIR).save(model, scaler, dict(
+        MODEL_CONFIG,
+        train_filter=TRAIN_FILTER,
+        samples={'total': len(data), 'calm': len(calm), 'not_calm': len(not_calm)},
+        metrics={'accuracy': float(accuracy),
+                 'report': classification_report(y_test, y_pred, output_dict=True)},
+    ), files={'training_report.txt': text})
+    joblib.dump(model, os.path.join(MODEL_DIR, "model.pkl"))
+    joblib.dump(scaler, os.path.join(MODEL_DIR, "scaler.pkl"))
+    with open(os.path.join(MODEL_DIR, "training_report.txt"), "w") as f:
+        f.write(text)
+
+    return True, f"Model {version} trained successfully! Accuracy: {accuracy:.2%}"
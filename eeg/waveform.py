@@ -0,0 +1,160 @@
+"""
+EEG Calmness Monitor - Waveform Broadcaster
+Coalesces live samples into binary display frames at a fixed frame rate,
+decimated to min/max envelopes sized to each client's plot
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+def minmax_envelope(samples, bucket):
+    """Interleaved (min, max) of each complete `bucket` of samples"""
+    blocks = samples[:len(samples) // bucket * bucket].reshape(-1, bucket)
+    envelope = np.empty((len(blocks), 2), dtype=np.float32)
+    envelope[:, 0] = blocks.min(axis=1)
+    envelope[:, 1] = blocks.max(axis=1)
+    return envelope.ravel()
+
+
+class WaveformBroadcaster:
+    """Batch samples into one ``waveform_frame`` message per display frame.
+
+    ``push()`` (called for every chunk) only appends to a pending list; the
+    ``run()`` thread wakes at most ``fps`` times a second and sends each
+    group of clients one frame through ``send(event, data, room)``::
+
+        {'mode': ..., 'fs': ..., 'bucket': samples per point,
+         'start': session index of the first sample, 'samples': float32 bytes}
+
+    Each client picks a plot width (px) and visible span (s) with
+    ``view()``; clients whose plot has fewer columns than samples get
+    ``bucket`` > 1 and ``samples`` holds interleaved per-bucket min/max
+    pairs, so spikes survive and the rate is bounded by
+    ``8 * width / seconds`` bytes/s whatever the sample rate. With
+    ``bucket`` == 1 the samples are sent as they are. Clients sharing a
+    bucket size share a room and one frame. Buckets are aligned to the
+    session sample index (bucket k holds samples ``k * bucket`` up to
+    ``(k + 1) * bucket``), whenever the first client of a size joined.
+
+    Socket.IO sends the bytes as a binary attachment, which the browser
+    reads as an ArrayBuffer (``new Float32Array(data.samples)``). Nothing is
+    sent, and the thread does not wake, while no samples arrive.
+    """
+
+    def __init__(self, fs, fps, send, width=1000, seconds=4.0, event='waveform_frame'):
+        self.fs = fs
+        self.interval = 1.0 / fps
+        self.send = send
+        self.default_view = (width, seconds)
+        self.event = event
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.pending = []
+        self.mode = None
+        self.index = 0  # session index of the first pending sample
+        self.clients = {}  # client id -> bucket
+        self.carry = {}  # bucket -> (start, samples of the unfinished bucket)
+        self.frames = 0
+
+    def bucket_for(self, width, seconds):
+        """Samples per plotted point for a plot `width` px wide showing `seconds`"""
+        width = min(max(int(width), 50), 8000)
+        seconds = min(max(float(seconds), 0.5), 120.0)
+        return max(1, int(self.fs * seconds / width))
+
+    @staticmethod
+    def room(bucket):
+        return f"waveform:{bucket}"
+
+    def room_of(self, client):
+        """Room a client currently receives frames in, or None"""
+        bucket = self.clients.get(client)
+        return None if bucket is None else self.room(bucket)
+
+    def view(self, client, width=None, seconds=None):
+        """Set a client's plot width and span; returns the room to join"""
+        default_width, default_seconds = self.default_view
+        bucket = self.bucket_for(width or default_width, seconds or default_seconds)
+        with self.lock:
+            self.clients[client] = bucket
+        return self.room(bucket)
+
+    def drop(self, client):
+        """Forget a disconnected client"""
+        with self.lock:
+            self.clients.pop(client, None)
+
+    def start(self, mode):
+        """Begin a new session (sample indices restart at 0)"""
+        with self.lock:
+            self.pending = []
+            self.carry = {}
+            self.mode = mode
+            self.index = 0
+
+    def push(self, samples):
+        """Queue samples for the next frame"""
+        with self.lock:
+            self.pending.append(np.asarray(samples, dtype=np.float32))
+        self.ready.set()
+
+    def take(self):
+        """One frame per bucket size in use, as a list of (room, data)"""
+        with self.lock:
+            self.ready.clear()
+            if not self.pending:
+                return []
+            samples = np.concatenate(self.pending)
+            start = self.index
+            self.pending = []
+            self.index += len(samples)
+
+            frames = []
+            buckets = set(self.clients.values())
+            self.carry = {b: c for b, c in self.carry.items() if b in buckets}
+            for bucket in sorted(buckets):
+                if bucket == 1:
+                    first, points = start, samples
+                else:
+                    # Buckets run on across frames: finish the carried one first.
+                    # A bucket size new to this session starts at the next
+                    # multiple of `bucket` (the leading partial bucket is
+                    # dropped), so bucket k always covers session samples
+                    # [k * bucket, (k + 1) * bucket), as snapshots do
+                    if bucket in self.carry:
+                        first, head = self.carry[bucket]
+                        block = np.concatenate([head, samples])
+                    else:
+                        skip = -start % bucket
+                        if skip >= len(samples):
+                            continue  # no bucket boundary in this frame yet
+                        first, block = start + skip, samples[skip:]
+                    points = minmax_envelope(block, bucket)
+                    done = len(points) // 2 * bucket
+                    self.carry[bucket] = (first + done, block[done:])
+                if len(points):
+                    frames.append((self.room(bucket), {
+                        'mode': self.mode,
+                        'fs': self.fs,
+                        'bucket': bucket,
+                        'start': first,
+                        'samples': points.tobytes(),
+                    }))
+        self.frames += 1
+        return frames
+
+    def run(self):
+        """Frame loop, call on a dedicated (daemon) thread"""
+        next_frame = time.monotonic()
+        while True:
+            self.ready.wait()
+            # Hold the first samples back until the frame boundary so the
+            # rest of the frame's chunks join them
+            now = time.monotonic()
+            next_frame = max(next_frame + self.interval, now)
+            time.sleep(next_frame - now)
+            for room, frame in self.take():
+                self.send(self.event, frame, room)
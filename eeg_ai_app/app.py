@@ -2,13 +2,25 @@ import serial
 import threading
 import time
 import numpy as np
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 import joblib
-from scipy.signal import butter, filtfilt, iirnotch, welch
+from scipy.signal import welch
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from ringbuffer import RingBuffer
+from dsp import eeg_filter
+from acquisition import make_parser
+from ingest import read_block
+from livefeed import LiveFeed
+from registry import ModelRegistry
 
 # ================= SETTINGS =================
 PORT = "COM6"
 BAUD = 115200
+SERIAL_FORMAT = "auto"   # "binary" frames, legacy "ascii" lines, or detect
 FS = 250
 ADC_MAX = 4095
 VREF = 3.3
@@ -21,32 +33,37 @@ HIGHCUT = 40
 NOTCH = 50
 Q = 30
 
-MODEL_PATH = "model/model_final.pkl"
+HISTORY = 50            # ratios kept for the chart
+LONG_POLL_SEC = 25      # max time /live?since= holds a request open
+SSE_HEARTBEAT_SEC = 15  # comment line on an idle /stream to keep proxies open
+
+MODEL_DIR = "model"      # versions in model/versions; new ones are used as they appear
+MODEL_PATH = "model/model_final.pkl"    # imported as the first version
 SCALER_PATH = "model/scaler_final.pkl"
+MODEL_WATCH_SEC = 2.0
 # ===========================================
 
 # -------- LOAD MODEL --------
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+registry = ModelRegistry(MODEL_DIR)
+if registry.latest() is None:
+    registry.save(joblib.load(MODEL_PATH), joblib.load(SCALER_PATH),
+                  {"features": ["Alpha", "Beta", "AlphaBetaRatio"], "imported_from": MODEL_PATH})
+registry.activate()
+
+def follow_latest(loaded):
+    """Watcher callback: the next window uses the newly preloaded version"""
+    registry.activate(loaded.version)
+    print(f"Using model {loaded.version}")
 
 # -------- FLASK --------
 app = Flask(__name__)
 
-latest_data = {
-    "ratio": [],
-    "state": "Waiting..."
-}
+# Written only by eeg_loop; HTTP threads read immutable versions of it
+feed = LiveFeed(HISTORY, state="Waiting...")
 
 # -------- FILTERS --------
-def bandpass(data):
-    nyq = 0.5 * FS
-    b, a = butter(4, [LOWCUT/nyq, HIGHCUT/nyq], btype="band")
-    return filtfilt(b, a, data)
-
-def notch(data):
-    nyq = 0.5 * FS
-    b, a = iirnotch(NOTCH/nyq, Q)
-    return filtfilt(b, a, data)
+# Bandpass + notch cascade, designed once and reused for every window
+EEG_FILTER = eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q)
 
 def band_power(freqs, psd, band):
     idx = np.logical_and(freqs >= band[0], freqs <= band[1])
@@ -54,27 +71,26 @@ def band_power(freqs, psd, band):
 
 # -------- EEG THREAD --------
 def eeg_loop():
-    global latest_data
-
     ser = serial.Serial(PORT, BAUD, timeout=1)
     time.sleep(2)
+    parser = make_parser(SERIAL_FORMAT)
 
-    buffer = []
     window_samples = int(WINDOW_SEC * FS)
     step_samples = int(STEP_SEC * FS)
+    buffer = RingBuffer(window_samples * 4)
+    next_end = window_samples  # absolute sample index where the next window ends
 
     while True:
-        if ser.in_waiting:
-            raw = ser.readline().decode(errors="ignore").strip()
-            if raw.isdigit():
-                v = (int(raw) / ADC_MAX) * VREF
-                buffer.append(v)
+        # Blocks until ~20 ms of samples is in instead of spinning on in_waiting
+        adc = read_block(ser, parser, FS)
+        buffer.extend((adc / ADC_MAX) * VREF)
 
-        if len(buffer) >= window_samples:
-            window = np.array(buffer[:window_samples])
-            buffer = buffer[step_samples:]
+        # A chunk can complete more than one hop
+        while buffer.total >= next_end:
+            window = buffer.latest(window_samples, next_end)
+            next_end += step_samples
 
-            filt = notch(bandpass(window))
+            filt = EEG_FILTER.apply(window)
             freqs, psd = welch(filt, FS, nperseg=512)
 
             alpha = band_power(freqs, psd, (8, 13))
@@ -84,12 +100,10 @@ def eeg_loop():
                 continue
 
             ratio = alpha / beta
-            features = scaler.transform([[alpha, beta, ratio]])
-            state = model.predict(features)[0]
+            current = registry.active  # one version per window, even mid-swap
+            state, _ = current.scorer.predict_one((alpha, beta, ratio))
 
-            latest_data["ratio"].append(ratio)
-            latest_data["ratio"] = latest_data["ratio"][-50:]
-            latest_data["state"] = state
+            feed.publish(float(ratio), str(state))
 
 # -------- ROUTES --------
 @app.route("/")
@@ -98,10 +112,43 @@ def index():
 
 @app.route("/live")
 def live_data():
-    return jsonify(latest_data)
+    """Full history, or with ?since=SEQ a long-poll for what came after SEQ"""
+    since = request.args.get("since", type=int)
+    if since is None:
+        snapshot = feed.current
+        return jsonify({
+            "seq": snapshot.seq,
+            "ratio": [value for _, value in snapshot.entries],
+            "state": snapshot.state,
+        })
+    snapshot = feed.wait(since, LONG_POLL_SEC)
+    return jsonify(LiveFeed.delta(snapshot, since))
+
+@app.route("/stream")
+def stream():
+    """Server-Sent Events: one event per new window, carrying only the delta.
+
+    The event id is the sequence number, so a reconnecting EventSource
+    resumes from its Last-Event-ID instead of starting over.
+    """
+    since = request.headers.get("Last-Event-ID", type=int) or request.args.get("since", 0, type=int)
+
+    def events(since):
+        while True:
+            snapshot = feed.wait(since, SSE_HEARTBEAT_SEC)
+            if snapshot.seq == since:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"id: {snapshot.seq}\ndata: {json.dumps(LiveFeed.delta(snapshot, since))}\n\n"
+            since = snapshot.seq
+
+    return Response(events(since), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # -------- START --------
 if __name__ == "__main__":
     t = threading.Thread(target=eeg_loop, daemon=True)
     t.start()
-    app.run(debug=False)
+    threading.Thread(target=registry.watch, args=(MODEL_WATCH_SEC, follow_latest), daemon=True).start()
+    # threaded: every open /stream holds one request thread
+    app.run(debug=False, threaded=True)
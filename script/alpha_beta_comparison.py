@@ -1,8 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import welch
-import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from session import read_signal
 
 # ---------------- SETTINGS ----------------
 FS = 250
@@ -10,26 +13,17 @@ ALPHA_BAND = (8, 13)
 BETA_BAND = (13, 30)
 
 DATA_PATH = "../data/module4_alpha_beta_comparison/"
-OPEN_FILE = DATA_PATH + "eyes_open_filtered.csv"
+OPEN_FILE = DATA_PATH + "eyes_open_filtered.csv"      # CSV or .eeg session file
 CLOSED_FILE = DATA_PATH + "eyes_closed_filtered.csv"
 # ------------------------------------------
 
-def load_signal(filename):
-    signal = []
-    with open(filename, "r") as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            signal.append(float(row[1]))
-    return np.array(signal)
-
 def band_power(freqs, psd, band):
     idx = np.logical_and(freqs >= band[0], freqs <= band[1])
     return np.trapz(psd[idx], freqs[idx])
 
 # -------- LOAD DATA --------
-eeg_open = load_signal(OPEN_FILE)
-eeg_closed = load_signal(CLOSED_FILE)
+eeg_open = read_signal(OPEN_FILE)
+eeg_closed = read_signal(CLOSED_FILE)
 
 # -------- PSD --------
 f_open, psd_open = welch(eeg_open, FS, nperseg=1024)
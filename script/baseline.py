@@ -4,6 +4,11 @@ import matplotlib.pyplot as plt
 import time
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from acquisition import make_parser
+from ingest import read_block
 
 # ---------------- USER SETTINGS ----------------
 PORT = 'COM6'          # 🔴 Change this
@@ -11,6 +16,7 @@ BAUD_RATE = 115200
 ADC_MAX = 4095         # UNO R4 = 12-bit
 VREF = 3.3
 FS = 250               # Sampling rate
+SERIAL_FORMAT = "auto"   # "binary" frames, legacy "ascii" lines, or detect
 DURATION = 60          # seconds
 SAVE_PATH = "../data/test1_baseline/"
 # ------------------------------------------------
@@ -29,19 +35,22 @@ print("Sit still, eyes open, breathe normally...")
 
 start_time = time.time()
 
-while len(eeg) < samples:
-    if ser.in_waiting:
-        raw = ser.readline().decode(errors='ignore').strip()
-        if raw.isdigit():
-            adc = int(raw)
-            voltage = (adc / ADC_MAX) * VREF
-            eeg.append(voltage)
-            timestamps.append(time.time() - start_time)
+parser = make_parser(SERIAL_FORMAT)
+received = 0
+
+while received < samples:
+    # Block until ~20 ms of data is in, then decode it in one go
+    adc = read_block(ser, parser, FS)
+    if len(adc):
+        t = time.time() - start_time
+        eeg.append((adc / ADC_MAX) * VREF)
+        timestamps.append(t - np.arange(len(adc))[::-1] / FS)
+        received += len(adc)
 
 ser.close()
 
-eeg = np.array(eeg)
-timestamps = np.array(timestamps)
+eeg = np.concatenate(eeg)[:samples]
+timestamps = np.concatenate(timestamps)[:samples]
 
 # ---------------- SAVE RAW DATA ----------------
 csv_file = SAVE_PATH + "raw_data.csv"
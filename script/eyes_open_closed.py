@@ -4,6 +4,11 @@ import matplotlib.pyplot as plt
 import time
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from acquisition import make_parser
+from ingest import read_block
 
 # ---------------- USER SETTINGS ----------------
 PORT = 'COM6'          # 🔴 Change this
@@ -11,6 +16,7 @@ BAUD_RATE = 115200
 ADC_MAX = 4095
 VREF = 3.3
 FS = 250
+SERIAL_FORMAT = "auto"   # "binary" frames, legacy "ascii" lines, or detect
 DURATION = 20          # seconds per condition
 SAVE_PATH = "../data/test3_eyes_open_closed/"
 # ------------------------------------------------
@@ -21,23 +27,26 @@ def record_eeg(label):
     ser = serial.Serial(PORT, BAUD_RATE)
     time.sleep(2)
 
+    parser = make_parser(SERIAL_FORMAT)
+    samples = FS * DURATION
+    received = 0
     eeg = []
     timestamps = []
 
     print(f"Recording: {label}")
     start_time = time.time()
 
-    while len(eeg) < FS * DURATION:
-        if ser.in_waiting:
-            raw = ser.readline().decode(errors="ignore").strip()
-            if raw.isdigit():
-                adc = int(raw)
-                voltage = (adc / ADC_MAX) * VREF
-                eeg.append(voltage)
-                timestamps.append(time.time() - start_time)
+    while received < samples:
+        # Block until ~20 ms of data is in, then decode it in one go
+        adc = read_block(ser, parser, FS)
+        if len(adc):
+            t = time.time() - start_time
+            eeg.append((adc / ADC_MAX) * VREF)
+            timestamps.append(t - np.arange(len(adc))[::-1] / FS)
+            received += len(adc)
 
     ser.close()
-    return np.array(timestamps), np.array(eeg)
+    return np.concatenate(timestamps)[:samples], np.concatenate(eeg)[:samples]
 
 # -------- RECORD EYES OPEN --------
 input("Press ENTER and keep EYES OPEN...")
@@ -1,8 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import welch
-import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from session import read_signal
 
 # ---------------- SETTINGS ----------------
 FS = 250                 # Sampling rate (Hz)
@@ -10,21 +13,13 @@ ALPHA_BAND = (8, 13)
 BETA_BAND = (13, 30)
 
 DATA_PATH = "../data/module3_fft_bandpower/"
-INPUT_FILE = DATA_PATH + "filtered_input.csv"
+INPUT_FILE = DATA_PATH + "filtered_input.csv"   # CSV or .eeg session file
 # ------------------------------------------
 
 os.makedirs(DATA_PATH, exist_ok=True)
 
 # -------- LOAD FILTERED EEG --------
-signal = []
-
-with open(INPUT_FILE, "r") as f:
-    reader = csv.reader(f)
-    next(reader)  # skip header
-    for row in reader:
-        signal.append(float(row[1]))
-
-signal = np.array(signal)
+signal = read_signal(INPUT_FILE)
 
 # -------- FFT USING WELCH PSD --------
 freqs, psd = welch(signal, FS, nperseg=1024)
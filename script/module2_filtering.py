@@ -1,8 +1,13 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.signal import butter, filtfilt, iirnotch, welch
+from scipy.signal import welch
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from dsp import eeg_filter
+from session import read_signal, read_times
 
 # ---------------- SETTINGS ----------------
 FS = 250                 # Sampling rate (Hz)
@@ -12,43 +17,18 @@ NOTCH_FREQ = 50.0        # India mains
 Q = 30.0                 # Notch quality factor
 
 DATA_PATH = "../data/module2_filtering_open/"
-RAW_FILE = DATA_PATH + "eyes_open.csv"
+RAW_FILE = DATA_PATH + "eyes_open.csv"   # CSV or .eeg session file
 # ------------------------------------------
 
 os.makedirs(DATA_PATH, exist_ok=True)
 
 # -------- LOAD RAW DATA --------
-time_vals = []
-signal = []
-
-with open(RAW_FILE, "r") as f:
-    reader = csv.reader(f)
-    next(reader)  # skip header
-    for row in reader:
-        time_vals.append(float(row[0]))
-        signal.append(float(row[1]))
-
-signal = np.array(signal)
-time_vals = np.array(time_vals)
-
-# -------- BANDPASS FILTER --------
-def bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype="band")
-    return filtfilt(b, a, data)
-
-# -------- NOTCH FILTER --------
-def notch_filter(data, notch_freq, fs, q):
-    nyq = 0.5 * fs
-    w0 = notch_freq / nyq
-    b, a = iirnotch(w0, q)
-    return filtfilt(b, a, data)
+signal = read_signal(RAW_FILE)
+time_vals = read_times(RAW_FILE)
 
-# Apply filters
-bandpassed = bandpass_filter(signal, LOWCUT, HIGHCUT, FS)
-filtered = notch_filter(bandpassed, NOTCH_FREQ, FS, Q)
+# -------- BANDPASS + NOTCH FILTER --------
+# Both filters run as one cached second-order-section cascade
+filtered = eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH_FREQ, Q).apply(signal)
 
 # -------- SAVE FILTERED DATA --------
 with open(DATA_PATH + "filtered_output.csv", "w", newline="") as f:
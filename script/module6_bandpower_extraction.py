@@ -2,7 +2,11 @@ import numpy as np
 import csv
 import os
 import matplotlib.pyplot as plt
-from scipy.signal import welch
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from dsp import batch_band_powers
+from session import read_signal
 
 # ---------------- SETTINGS ----------------
 FS = 250                     # Sampling rate (Hz)
@@ -13,51 +17,25 @@ ALPHA_BAND = (8, 13)
 BETA_BAND  = (13, 30)
 
 DATA_PATH = "../data/module6_bandpower_extraction/"
-INPUT_FILE = DATA_PATH + "filtered_input.csv"
+INPUT_FILE = DATA_PATH + "filtered_input.csv"   # CSV or .eeg session file
 # ------------------------------------------
 
 os.makedirs(DATA_PATH, exist_ok=True)
 
 # -------- LOAD FILTERED EEG --------
-signal = []
-
-with open(INPUT_FILE, "r") as f:
-    reader = csv.reader(f)
-    next(reader)  # skip header
-    for row in reader:
-        signal.append(float(row[1]))
-
-signal = np.array(signal)
+signal = read_signal(INPUT_FILE)
 
 # -------- SLIDING WINDOW PARAMETERS --------
 window_size = int(WINDOW_SEC * FS)
 step_size = int(STEP_SEC * FS)
 
-def band_power(freqs, psd, band):
-    idx = np.logical_and(freqs >= band[0], freqs <= band[1])
-    return np.trapz(psd[idx], freqs[idx])
-
 # -------- SLIDING WINDOW FFT --------
-alpha_list = []
-beta_list = []
-window_index = []
-
-win = 1
-for start in range(0, len(signal) - window_size, step_size):
-    window = signal[start:start + window_size]
-
-    freqs, psd = welch(window, fs=FS, nperseg=256)
-
-    alpha = band_power(freqs, psd, ALPHA_BAND)
-    beta  = band_power(freqs, psd, BETA_BAND)
-
-    alpha_list.append(alpha)
-    beta_list.append(beta)
-    window_index.append(win)
-    win += 1
-
-alpha_arr = np.array(alpha_list)
-beta_arr = np.array(beta_list)
+# All windows at once: strided view, batched rFFT, band-weight matmul
+powers = batch_band_powers(signal, FS, window_size, step_size,
+                           [ALPHA_BAND, BETA_BAND], nperseg=256)
+alpha_arr = powers[:, 0]
+beta_arr = powers[:, 1]
+window_index = np.arange(1, len(powers) + 1)
 
 # -------- SAVE BANDPOWER CSV --------
 csv_file = DATA_PATH + "bandpower_windows.csv"
@@ -2,14 +2,23 @@ import serial
 import numpy as np
 import time
 import matplotlib.pyplot as plt
-from scipy.signal import butter, filtfilt, iirnotch, welch
+from scipy.signal import welch
 import joblib
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from ringbuffer import RingBuffer
+from dsp import eeg_filter
+from acquisition import make_parser
+from ingest import read_block
+from inference import LinearScorer
 
 # ---------------- SETTINGS ----------------
 PORT = "COM6"              # 🔴 change if needed
 BAUD = 115200
+SERIAL_FORMAT = "auto"     # "binary" frames, legacy "ascii" lines, or detect
 FS = 250
 ADC_MAX = 4095
 VREF = 3.3
@@ -22,6 +31,10 @@ HIGHCUT = 40
 NOTCH = 50
 Q = 30
 
+# "zero_phase" filters each window from scratch; "causal" filters every
+# sample once on arrival (~12-13 ms group delay, see eeg/dsp.py)
+FILTER_MODE = "zero_phase"
+
 MODEL_PATH = "../data/module8_ai/model.pkl"
 SCALER_PATH = "../data/module8_ai/scaler.pkl"
 
@@ -32,19 +45,12 @@ LOG_FILE = SAVE_PATH + "realtime_ai_log.csv"
 os.makedirs(SAVE_PATH, exist_ok=True)
 
 # -------- LOAD AI MODEL --------
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+# Scaler folded into the model weights: one dot product per window
+scorer = LinearScorer.fold(joblib.load(MODEL_PATH), joblib.load(SCALER_PATH))
 
 # -------- FILTER FUNCTIONS --------
-def bandpass(data):
-    nyq = 0.5 * FS
-    b, a = butter(4, [LOWCUT/nyq, HIGHCUT/nyq], btype="band")
-    return filtfilt(b, a, data)
-
-def notch(data):
-    nyq = 0.5 * FS
-    b, a = iirnotch(NOTCH/nyq, Q)
-    return filtfilt(b, a, data)
+# Bandpass + notch cascade, designed once and reused for every window
+EEG_FILTER = eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q)
 
 def band_power(freqs, psd, band):
     idx = np.logical_and(freqs >= band[0], freqs <= band[1])
@@ -53,10 +59,12 @@ def band_power(freqs, psd, band):
 # -------- SERIAL --------
 ser = serial.Serial(PORT, BAUD, timeout=1)
 time.sleep(2)
+parser = make_parser(SERIAL_FORMAT)
 
-buffer = []
 window_samples = int(WINDOW_SEC * FS)
 step_samples = int(STEP_SEC * FS)
+buffer = RingBuffer(window_samples * 4)
+next_end = window_samples  # absolute sample index where the next window ends
 
 # -------- CSV LOG --------
 log = open(LOG_FILE, "w", newline="")
@@ -81,21 +89,21 @@ print("Real-time AI feedback started. Press CTRL+C to stop.")
 try:
     while True:
         # -------- READ SERIAL --------
-        if ser.in_waiting:
-            raw = ser.readline().decode(errors="ignore").strip()
-
-            if raw.isdigit():
-                adc = int(raw)
-                voltage = (adc / ADC_MAX) * VREF
-                buffer.append(voltage)
+        # Blocks until ~20 ms of samples is in instead of spinning on in_waiting
+        adc = read_block(ser, parser, FS)
+        voltage = (adc / ADC_MAX) * VREF
+        if FILTER_MODE == "causal":
+            voltage = EEG_FILTER.step(voltage)
+        buffer.extend(voltage)
 
         # -------- PROCESS WINDOW --------
-        if len(buffer) >= window_samples:
-            window = np.array(buffer[:window_samples])
-            buffer = buffer[step_samples:]
+        # A chunk can complete more than one hop
+        while buffer.total >= next_end:
+            window = buffer.latest(window_samples, next_end)
+            next_end += step_samples
 
             # Filter
-            filt = notch(bandpass(window))
+            filt = window if FILTER_MODE == "causal" else EEG_FILTER.apply(window)
 
             # FFT
             freqs, psd = welch(filt, FS, nperseg=512)
@@ -105,9 +113,7 @@ try:
             ci = alpha / beta if beta != 0 else 0
 
             # AI prediction
-            features = np.array([[alpha, beta, ci]])
-            features_scaled = scaler.transform(features)
-            state = model.predict(features_scaled)[0]
+            state, _ = scorer.predict_one((alpha, beta, ci))
 
             # Time
             t = time.time() - t0
@@ -1,7 +1,14 @@
 import numpy as np
 import pandas as pd
 import os
-from scipy.signal import butter, filtfilt, iirnotch, welch
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from dsp import (
+    eeg_filter, sliding_windows, batch_welch, FeatureBank, EEG_BANDS, Decimator, decimated_rate,
+    OverlapStream, WindowStream,
+)
+from session import Session, SessionWriter, is_session, read_blocks
 
 # ================= SETTINGS =================
 FS = 250                     # Sampling rate (Hz)
@@ -19,6 +26,24 @@ STEP_SEC = 0.5
 ALPHA_BAND = (8, 13)
 BETA_BAND = (13, 30)
 
+# Any FeatureBank name can be added; all come from one PSD per window
+FEATURES = ["Alpha", "Beta", "AlphaBetaRatio"]
+BANDS = dict(EEG_BANDS, alpha=ALPHA_BAND, beta=BETA_BAND)
+NPERSEG = 512
+
+# Resample after filtering to the lowest rate covering the highest band
+# (250 -> 100 Hz); windows, nperseg and the filtered session shrink with it
+DECIMATE = False
+
+# Streaming mode: read the recording BLOCK_SEC at a time, filter each block
+# with MARGIN_SEC of context on both sides, and write filtered samples and
+# features as they are ready. Memory stays fixed for recordings of any
+# length; with a 30 s margin the results equal the whole-array pipeline
+# to floating-point rounding (~1e-13 V)
+STREAMING = True
+BLOCK_SEC = 120.0
+MARGIN_SEC = 30.0
+
 INPUT_PATH = "../data/calibration/"
 OUTPUT_PATH = "../data/pipeline_output/"
 # ===========================================
@@ -26,79 +51,90 @@ OUTPUT_PATH = "../data/pipeline_output/"
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
 # ---------- FILTER FUNCTIONS ----------
-def bandpass(data):
-    nyq = 0.5 * FS
-    b, a = butter(4, [LOWCUT/nyq, HIGHCUT/nyq], btype="band")
-    return filtfilt(b, a, data)
-
-def notch(data):
-    nyq = 0.5 * FS
-    b, a = iirnotch(NOTCH/nyq, Q)
-    return filtfilt(b, a, data)
-
-def band_power(freqs, psd, band):
-    idx = np.logical_and(freqs >= band[0], freqs <= band[1])
-    return np.trapz(psd[idx], freqs[idx])
+# Bandpass + notch cascade, designed once and reused for every file
+EEG_FILTER = eeg_filter(FS, LOWCUT, HIGHCUT, NOTCH, Q)
+
+# ---------- DECIMATION ----------
+if DECIMATE:
+    DSP_FS, UP, DOWN = decimated_rate(FS, max(high for _, high in BANDS.values()), WINDOW_SEC, STEP_SEC)
+else:
+    DSP_FS, UP, DOWN = FS, 1, 1
+DSP_NPERSEG = int(round(NPERSEG * DSP_FS / FS))
+DECIMATOR = Decimator(UP, DOWN)
+
+# ---------- FEATURE BANK ----------
+FEATURE_BANK = FeatureBank.for_welch(DSP_FS, DSP_NPERSEG, int(WINDOW_SEC * DSP_FS), BANDS)
+
+BETA_INDEX = FEATURE_BANK.index(["Beta"])[0]
+FEATURE_INDEX = FEATURE_BANK.index(FEATURES)
+
+def window_features(windows):
+    """Feature rows of filtered windows; windows without beta power are skipped"""
+    if len(windows) == 0:
+        return np.empty((0, len(FEATURES)))
+    freqs, psd = batch_welch(windows, DSP_FS, DSP_NPERSEG)
+    values = FEATURE_BANK.compute(psd)
+    return values[values[:, BETA_INDEX] != 0][:, FEATURE_INDEX]
+
+# ---------- SESSION FILES ----------
+def load_voltage(label):
+    """Raw recording in volts and the time of its first sample: a session
+    file (memory-mapped) or, for older recordings, a CSV"""
+    path = INPUT_PATH + f"{label}_raw.eeg"
+    if is_session(path):
+        raw = Session(path)
+        return raw.voltage(), raw.t0, raw.meta.get("start_time")
+    df = pd.read_csv(INPUT_PATH + f"{label}_raw.csv")
+    return (df["ADC"].values / ADC_MAX) * VREF, float(df["Time(s)"].values[0]), None
+
+def voltage_blocks(label, block):
+    """Like load_voltage, but yields the recording `block` samples at a time
+    (memory-mapped views of a session file, or CSV rows parsed per block);
+    returns (blocks, t0, start_time)"""
+    path = INPUT_PATH + f"{label}_raw.eeg"
+    if is_session(path):
+        raw = Session(path)
+        return raw.voltage_blocks(block), raw.t0, raw.meta.get("start_time")
+    path = INPUT_PATH + f"{label}_raw.csv"
+    t0 = float(next(read_blocks(path, 1, "Time(s)"))[0])
+    return (values * (VREF / ADC_MAX) for values in read_blocks(path, block, "ADC")), t0, None
+
+def filtered_writer(label, t0, start_time):
+    meta = {
+        "fs": DSP_FS, "adc_max": ADC_MAX, "vref": VREF, "start_time": start_time, "t0": t0,
+        "filter": {"lowcut": LOWCUT, "highcut": HIGHCUT, "notch": NOTCH, "q": Q, "order": 4,
+                   "zero_phase": True, "input_fs": FS},
+    }
+    return SessionWriter(OUTPUT_PATH + f"{label}_filtered.eeg", [("Filtered_Voltage", "<f4")], meta)
+
+def save_filtered(label, filtered, t0, start_time):
+    writer = filtered_writer(label, t0, start_time)
+    writer.append(filtered)
+    writer.close()
 
 # ---------- CORE PIPELINE FUNCTION ----------
-def process_file(filename, label):
-    print(f"\nProcessing: {filename}")
-
-    # Load raw data
-    df = pd.read_csv(INPUT_PATH + filename)
-    adc = df["ADC"].values
-    time_vals = df["Time(s)"].values
+def process_file(label):
+    print(f"\nProcessing: {label}")
 
-    # Convert ADC to voltage
-    voltage = (adc / ADC_MAX) * VREF
+    # Load raw data, converted to voltage
+    voltage, t0, start_time = load_voltage(label)
 
-    # Filtering
-    filtered = notch(bandpass(voltage))
+    # Filtering, then resampling to the DSP rate
+    filtered = DECIMATOR.apply(EEG_FILTER.apply(voltage))
 
     # Save filtered EEG
-    filtered_df = pd.DataFrame({
-        "Time(s)": time_vals,
-        "Filtered_Voltage": filtered
-    })
-    filtered_df.to_csv(
-        OUTPUT_PATH + f"{label}_filtered.csv",
-        index=False
-    )
+    save_filtered(label, filtered, t0, start_time)
 
     # Sliding window parameters
-    window_size = int(WINDOW_SEC * FS)
-    step_size = int(STEP_SEC * FS)
+    window_size = int(WINDOW_SEC * DSP_FS)
+    step_size = int(STEP_SEC * DSP_FS)
 
-    features = []
-    window_id = 1
-
-    for start in range(0, len(filtered) - window_size, step_size):
-        window = filtered[start:start + window_size]
-
-        freqs, psd = welch(window, FS, nperseg=512)
-
-        alpha = band_power(freqs, psd, ALPHA_BAND)
-        beta = band_power(freqs, psd, BETA_BAND)
-
-        if beta == 0:
-            continue
-
-        ratio = alpha / beta
-
-        features.append([
-            window_id,
-            alpha,
-            beta,
-            ratio
-        ])
-
-        window_id += 1
+    # All windows at once: strided view, batched rFFT, feature bank matmuls
+    values = window_features(sliding_windows(filtered, window_size, step_size))
 
     # Save features
-    feature_df = pd.DataFrame(
-        features,
-        columns=["Window", "Alpha", "Beta", "AlphaBetaRatio"]
-    )
+    feature_df = pd.DataFrame(values, columns=FEATURES)
+    feature_df.insert(0, "Window", np.arange(1, len(values) + 1))
 
     feature_df.to_csv(
         OUTPUT_PATH + f"{label}_features.csv",
@@ -107,8 +143,54 @@ def process_file(filename, label):
 
     print(f"Saved {label}_features.csv ({len(feature_df)} windows)")
 
+# ---------- STREAMING PIPELINE ----------
+def filter_blocks(blocks):
+    """Zero-phase filtered (and resampled) signal of a stream of voltage blocks.
+
+    Each BLOCK_SEC block is filtered together with MARGIN_SEC of input on
+    both sides and only its middle is kept (overlap-save); the last block
+    is filtered up to the real end of the recording, like the whole array.
+    """
+    stream = OverlapStream(lambda segment: DECIMATOR.apply(EEG_FILTER.apply(segment)),
+                           int(MARGIN_SEC * FS), int(BLOCK_SEC * FS), UP, DOWN)
+    for voltage in blocks:
+        yield stream.push(voltage)
+    yield stream.finish()
+
+def stream_features(filtered_blocks):
+    """Generator of (window number, feature row) on the whole-array window schedule"""
+    windows = WindowStream(int(WINDOW_SEC * DSP_FS), int(STEP_SEC * DSP_FS))
+    number = 0
+    for filtered in filtered_blocks:
+        for row in window_features(windows.push(filtered)):
+            number += 1
+            yield number, row
+
+def process_file_streaming(label):
+    print(f"\nProcessing: {label} (streaming)")
+
+    blocks, t0, start_time = voltage_blocks(label, int(BLOCK_SEC * FS))
+    writer = filtered_writer(label, t0, start_time)
+
+    def saved(filtered_blocks):
+        # Filtered samples go to disk as they pass on to the windows
+        for filtered in filtered_blocks:
+            writer.append(filtered)
+            yield filtered
+
+    count = 0
+    with open(OUTPUT_PATH + f"{label}_features.csv", "w") as f:
+        f.write(",".join(["Window"] + FEATURES) + "\n")
+        for number, row in stream_features(saved(filter_blocks(blocks))):
+            f.write(",".join([str(number)] + [repr(float(value)) for value in row]) + "\n")
+            count = number
+    writer.close()
+
+    print(f"Saved {label}_features.csv ({count} windows)")
+
 # ---------- RUN PIPELINE ----------
-process_file("calm_raw.csv", "calm")
-process_file("not_calm_raw.csv", "not_calm")
+run = process_file_streaming if STREAMING else process_file
+run("calm")
+run("not_calm")
 
 print("\nPipeline completed successfully.")
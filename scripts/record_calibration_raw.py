@@ -1,11 +1,20 @@
 import serial
 import time
-import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eeg"))
+from acquisition import make_parser
+from ingest import read_block
+from session import SessionWriter
 
 # ---------------- SETTINGS ----------------
 PORT = "COM6"          # 🔴 change if needed
 BAUD = 115200
+FS = 250
+ADC_MAX = 4095
+VREF = 3.3
+SERIAL_FORMAT = "auto"   # "binary" frames, legacy "ascii" lines, or detect
 DURATION_SEC = 300     # 5 minutes per session
 SAVE_PATH = "../data/calibration/"
 # -----------------------------------------
@@ -14,30 +23,36 @@ os.makedirs(SAVE_PATH, exist_ok=True)
 
 # -------- ASK USER --------
 session = input("Enter session name (calm / not_calm): ").strip().lower()
-filename = SAVE_PATH + f"{session}_raw.csv"
+filename = SAVE_PATH + f"{session}_raw.eeg"
 
 # -------- SERIAL --------
 ser = serial.Serial(PORT, BAUD, timeout=1)
 time.sleep(2)
+parser = make_parser(SERIAL_FORMAT)
 
 print(f"\nRecording '{session}' session for {DURATION_SEC} seconds...")
 print("Press CTRL+C to stop early.\n")
 
 start_time = time.time()
 
-with open(filename, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Time(s)", "ADC"])
-
-    try:
-        while time.time() - start_time < DURATION_SEC:
-            if ser.in_waiting:
-                raw = ser.readline().decode(errors="ignore").strip()
-                if raw.isdigit():
-                    t = time.time() - start_time
-                    writer.writerow([f"{t:.4f}", int(raw)])
-    except KeyboardInterrupt:
-        print("\nRecording stopped early by user.")
+# Session file (see eeg/session.py): uint16 ADC column, sample i at t0 + i / FS
+writer = SessionWriter(filename, [("ADC", "<u2")],
+                       {"fs": FS, "adc_max": ADC_MAX, "vref": VREF, "start_time": start_time,
+                        "t0": 0.0, "filter": None})
+t0 = None
+
+try:
+    while time.time() - start_time < DURATION_SEC:
+        # Block until ~20 ms of data is in, then decode it in one go
+        adc = read_block(ser, parser, FS)
+        if len(adc):
+            if t0 is None:
+                t0 = time.time() - start_time - (len(adc) - 1) / FS
+            writer.append(adc)
+except KeyboardInterrupt:
+    print("\nRecording stopped early by user.")
+finally:
+    writer.close(t0=t0 or 0.0)
 
 ser.close()
 print(f"\nData saved to: {filename}")